@@ -46,7 +46,8 @@ class AppSettings:
             'comfyui_url': 'http://127.0.0.1:8000',  # ComfyUI default port
             'pen_lift_height': 16,
             'svg_method': 'clean_v1',
-            'max_commands': 5000
+            'max_commands': 5000,
+            'edge_detection': 'canny'
         }
 
     def save(self, settings):
@@ -248,7 +249,8 @@ def save_photo():
                     try:
                         base_name = f'drawing_{timestamp}'
                         thick_variations = thick_joining_variations.generate_all_variations(
-                            caricature_filepath, base_name
+                            caricature_filepath, base_name,
+                            fast_edges=app_settings.get('edge_detection', 'canny') == 'gradient'
                         )
                     except Exception as e:
                         print(f"⚠️  Warning: Could not generate thick joining variations: {e}")
@@ -938,7 +940,8 @@ def upload_image():
                     try:
                         base_name = f'drawing_{timestamp}'
                         thick_variations = thick_joining_variations.generate_all_variations(
-                            caricature_filepath, base_name
+                            caricature_filepath, base_name,
+                            fast_edges=app_settings.get('edge_detection', 'canny') == 'gradient'
                         )
                     except Exception as e:
                         print(f"⚠️  Warning: Could not generate thick joining variations: {e}")
@@ -1107,7 +1110,8 @@ def process_saved_photo():
                     try:
                         base_name = f'drawing_{timestamp}'
                         thick_variations = thick_joining_variations.generate_all_variations(
-                            caricature_filepath, base_name
+                            caricature_filepath, base_name,
+                            fast_edges=app_settings.get('edge_detection', 'canny') == 'gradient'
                         )
                     except Exception as e:
                         print(f"⚠️  Warning: Could not generate thick joining variations: {e}")
@@ -17,17 +17,30 @@ Example:
     python 04_gcode_sender.py COM3 --interactive
 """
 
+import os
 import sys
 import time
+import queue
 import serial
+import serial.threaded
 from pathlib import Path
 
+from dexarm import ResponseReader
+
 class GCodeSender:
+    # Files with at least this share of plain G0/G1 moves use the streaming fast path
+    FAST_PATH_RATIO = 0.95
+    # Commands allowed in flight before waiting for an 'ok' (fits Marlin's command buffer)
+    PIPELINE_WINDOW = 4
+
     def __init__(self, port, baudrate=115200):
         """Initialize GCode sender"""
         self.port = port
         self.baudrate = baudrate
         self.serial = None
+        self.reader = None
+        self.rx_q = None
+        self._fd = None
         self.line_count = 0
 
     def connect(self):
@@ -42,9 +55,21 @@ class GCodeSender:
             )
             time.sleep(2)  # Wait for connection to stabilize
 
-            # Flush any initial data
-            self.serial.flushInput()
-            self.serial.flushOutput()
+            # Drain the startup banner until the line goes idle
+            self.serial.timeout = 0.2
+            while self.serial.readline():
+                pass
+            self.serial.timeout = 5
+
+            # Line framing runs in a background thread; we only pull from the queue
+            self.reader = serial.threaded.ReaderThread(self.serial, ResponseReader)
+            self.reader.start()
+            _, protocol = self.reader.connect()
+            self.rx_q = protocol.rx_q
+
+            # On POSIX the hot write path can go straight to the file descriptor
+            if sys.platform != 'win32':
+                self._fd = self.serial.fileno()
 
             print("✅ Connected!")
             return True
@@ -70,11 +95,15 @@ class GCodeSender:
 
         if wait_for_ok:
             # Wait for 'ok' response
-            response = self.serial.readline().decode().strip()
-            if 'ok' in response.lower():
-                return True
-            else:
-                print(f"⚠️  Unexpected response: {response}")
+            response = []
+            try:
+                while True:
+                    line = self.rx_q.get(timeout=5)
+                    if 'ok' in line.lower():
+                        return True
+                    response.append(line)
+            except queue.Empty:
+                print(f"⚠️  Unexpected response: {' | '.join(response)}")
                 return False
 
         return True
@@ -108,24 +137,26 @@ class GCodeSender:
         self.send_command("G28")  # Home
         time.sleep(3)
 
+        # Pure move streams skip the general per-command path
+        moves = sum(1 for line in gcode_lines if line.startswith(('G0 ', 'G1 ')))
+        fast_path = total_lines > 0 and moves / total_lines >= self.FAST_PATH_RATIO
+
         # Send gcode line by line
-        print("✏️  Executing gcode...")
+        print("✏️  Executing gcode..." + (" (streaming moves)" if fast_path else ""))
         start_time = time.time()
 
-        for i, line in enumerate(gcode_lines, 1):
-            success = self.send_command(line)
-
-            if not success:
-                print(f"\n❌ Failed at line {i}: {line}")
+        if fast_path:
+            if not self._stream_moves(gcode_lines, start_time, progress_callback):
                 return False
+        else:
+            for i, line in enumerate(gcode_lines, 1):
+                success = self.send_command(line)
+
+                if not success:
+                    print(f"\n❌ Failed at line {i}: {line}")
+                    return False
 
-            # Progress update
-            if progress_callback:
-                progress_callback(i, total_lines)
-            elif i % 10 == 0 or i == total_lines:
-                percent = (i / total_lines) * 100
-                elapsed = time.time() - start_time
-                print(f"  Progress: {i}/{total_lines} ({percent:.1f}%) - {elapsed:.1f}s", end='\r')
+                self._report_progress(i, total_lines, start_time, progress_callback)
 
         elapsed = time.time() - start_time
         print(f"\n✅ Complete! Executed {total_lines} commands in {elapsed:.1f}s")
@@ -136,6 +167,62 @@ class GCodeSender:
 
         return True
 
+    def _stream_moves(self, gcode_lines, start_time, progress_callback=None):
+        """
+        Stream pre-encoded move lines, keeping PIPELINE_WINDOW commands in flight
+
+        Returns:
+            bool: True if every line was acknowledged
+        """
+        payload = [f"{line}\n".encode() for line in gcode_lines]
+        total_lines = len(payload)
+        write = self._write_fast if self._fd is not None else self.serial.write
+        get_line = self.rx_q.get
+        sent = acked = 0
+
+        while acked < total_lines:
+            while sent < total_lines and sent - acked < self.PIPELINE_WINDOW:
+                write(payload[sent])
+                sent += 1
+            self.line_count = sent
+
+            try:
+                response = get_line(timeout=5).lower()
+            except queue.Empty:
+                print(f"\n❌ Failed at line {acked + 1}: {gcode_lines[acked]}")
+                return False
+
+            if response.startswith('error'):
+                print(f"\n❌ Failed at line {acked + 1}: {gcode_lines[acked]} ({response})")
+                return False
+            if 'ok' not in response:
+                continue
+
+            acked += 1
+            self._report_progress(acked, total_lines, start_time, progress_callback)
+
+        return True
+
+    def _write_fast(self, buf):
+        """Write a short command with a single os.write, bypassing pyserial's wrapper"""
+        # The port is non-blocking: a full transmit buffer gives a short write
+        # or EAGAIN, so pyserial's write (select loop + write_timeout) sends the rest
+        try:
+            written = os.write(self._fd, buf)
+        except BlockingIOError:
+            written = 0
+        if written < len(buf):
+            self.serial.write(buf[written:])
+
+    def _report_progress(self, i, total_lines, start_time, progress_callback=None):
+        """Progress update"""
+        if progress_callback:
+            progress_callback(i, total_lines)
+        elif i % 10 == 0 or i == total_lines:
+            percent = (i / total_lines) * 100
+            elapsed = time.time() - start_time
+            print(f"  Progress: {i}/{total_lines} ({percent:.1f}%) - {elapsed:.1f}s", end='\r')
+
     def interactive_mode(self):
         """Interactive gcode command entry"""
         print("\n💻 Interactive GCode Mode")
@@ -146,17 +233,20 @@ class GCodeSender:
         print("  'quit' - Exit")
         print()
 
+        shortcuts = {
+            'home': self._home,
+            'help': self.show_help,
+        }
+
         while True:
             try:
                 command = input("gcode> ").strip()
+                cmd_lc = command.lower()
 
-                if command.lower() == 'quit':
+                if cmd_lc == 'quit':
                     break
-                elif command.lower() == 'home':
-                    self.send_command("G28")
-                    print("Homed")
-                elif command.lower() == 'help':
-                    self.show_help()
+                elif cmd_lc in shortcuts:
+                    shortcuts[cmd_lc]()
                 elif command:
                     success = self.send_command(command)
                     if success:
@@ -168,6 +258,11 @@ class GCodeSender:
                 print("\nExiting...")
                 break
 
+    def _home(self):
+        """Home the arm (interactive 'home' shortcut)"""
+        self.send_command("G28")
+        print("Homed")
+
     def show_help(self):
         """Show common gcode commands"""
         print("\n📖 Common GCode Commands:")
@@ -181,6 +276,10 @@ class GCodeSender:
 
     def close(self):
         """Close serial connection"""
+        if self.reader:
+            self.reader.stop()
+            self.reader = None
+        self._fd = None
         if self.serial and self.serial.is_open:
             self.serial.close()
             print("🔌 Disconnected")
@@ -61,6 +61,24 @@ def kill_other_python_instances():
         print(f"  Warning: Could not kill other instances: {e}")
         print("  Continuing anyway...")
 
+def send_raw(arm, command, timeout=1.0):
+    """
+    Send a command and return every response line
+
+    The Dexarm reader thread owns the serial port, so responses are
+    collected from its queue instead of polling the port directly.
+
+    Returns:
+        list: Response lines (ending with 'ok' unless timed out)
+    """
+    # Drop leftovers (e.g. the 'ok' of M17/M84, sent without waiting) so
+    # they are not mistaken for this command's reply
+    while not arm.rx_q.empty():
+        arm.rx_q.get_nowait()
+
+    response = arm.send_gcode(command, timeout=timeout)
+    return response.splitlines()
+
 def debug_position_reading():
     """Test position reading and show raw responses"""
 
@@ -88,15 +106,7 @@ def debug_position_reading():
 
     for i in range(3):
         print(f"\nAttempt {i+1}:")
-        arm.serial.write(b"M114\n")
-        time.sleep(0.2)
-
-        # Read all available lines
-        lines = []
-        while arm.serial.in_waiting > 0:
-            line = arm.serial.readline().decode().strip()
-            if line:
-                lines.append(line)
+        lines = send_raw(arm, "M114")
 
         print(f"  Raw response ({len(lines)} lines):")
         for line in lines:
@@ -115,15 +125,7 @@ def debug_position_reading():
 
     for i in range(5):
         print(f"\nAttempt {i+1}:")
-        arm.serial.write(b"M114\n")
-        time.sleep(0.2)
-
-        # Read all available lines
-        lines = []
-        while arm.serial.in_waiting > 0:
-            line = arm.serial.readline().decode().strip()
-            if line:
-                lines.append(line)
+        lines = send_raw(arm, "M114")
 
         print(f"  Raw response ({len(lines)} lines):")
         for line in lines:
@@ -147,14 +149,7 @@ def debug_position_reading():
 
     for cmd in commands:
         print(f"\nCommand: {cmd}")
-        arm.serial.write(f"{cmd}\n".encode())
-        time.sleep(0.3)
-
-        lines = []
-        while arm.serial.in_waiting > 0:
-            line = arm.serial.readline().decode().strip()
-            if line:
-                lines.append(line)
+        lines = send_raw(arm, cmd)
 
         print(f"  Response ({len(lines)} lines):")
         for line in lines:
@@ -5,13 +5,154 @@ Direct serial communication with Rotrics DexArm using pyserial.
 DexArm uses Marlin firmware and responds to standard G-code commands.
 """
 
+import queue
+import re
+import socket
 import serial
+import serial.threaded
 import time
 
+# Matches the main M114 position line, e.g. "X:200.00 Y:0.00 Z:0.00 E:0.00 ..."
+_POS_RE = re.compile(r'^X:\s*(-?[\d.]+)\s+Y:\s*(-?[\d.]+)\s+Z:\s*(-?[\d.]+)', re.MULTILINE)
+
+# Address of the optional connection broker (see dexarm_broker.py)
+BROKER_ADDRESS = ('127.0.0.1', 51234)
+
+# First line the broker sends a new client: attached, or another client owns the arm
+BROKER_READY = b'BROKER READY\n'
+BROKER_BUSY = b'BROKER BUSY\n'
+
+
+class BrokerSerial:
+    """
+    Minimal serial-like wrapper around a socket to a running dexarm_broker.
+
+    Implements the subset of the pyserial API used by Dexarm so the rest of
+    the class does not need to know whether it talks to the port directly.
+    """
+
+    def __init__(self, sock, timeout=10):
+        self.sock = sock
+        self.timeout = timeout
+        self._rx = bytearray()
+        self.is_open = True
+
+    def _pump(self, wait=None):
+        """Move whatever the socket has into the receive buffer"""
+        self.sock.settimeout(max(wait or 0.0, 0.0))
+        try:
+            data = self.sock.recv(4096)
+        except (BlockingIOError, socket.timeout):
+            return
+        if not data:
+            self.is_open = False
+            raise serial.SerialException("Broker connection closed")
+        self._rx += data
+
+    @property
+    def in_waiting(self):
+        self._pump()
+        return len(self._rx)
+
+    def read(self, size=1):
+        deadline = time.monotonic() + (self.timeout or 0)
+        while len(self._rx) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._pump(remaining)
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def readline(self):
+        deadline = time.monotonic() + (self.timeout or 0)
+        while b'\n' not in self._rx:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._pump(remaining)
+        end = self._rx.find(b'\n') + 1 or len(self._rx)
+        data = bytes(self._rx[:end])
+        del self._rx[:end]
+        return data
+
+    def write(self, data):
+        self.sock.sendall(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self._pump()
+        self._rx.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    flushInput = reset_input_buffer
+    flushOutput = reset_output_buffer
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.sock.close()
+
+
+def connect_to_broker(timeout=10):
+    """
+    Try to attach to a running dexarm_broker
+
+    Returns:
+        BrokerSerial: Connected wrapper, or None if no broker is listening
+                      or it is already serving another client
+    """
+    try:
+        sock = socket.create_connection(BROKER_ADDRESS, timeout=0.2)
+    except OSError:
+        return None
+
+    # Wait for the greeting so a busy broker is noticed now, not as a
+    # timeout on the first command
+    greeting = b''
+    try:
+        sock.settimeout(1.0)
+        while not greeting.endswith(b'\n'):
+            data = sock.recv(64)
+            if not data:
+                break
+            greeting += data
+    except OSError:
+        pass
+
+    if greeting != BROKER_READY:
+        if greeting == BROKER_BUSY:
+            print("⚠️  DexArm broker is busy with another client, trying the port directly")
+        sock.close()
+        return None
+    return BrokerSerial(sock, timeout=timeout)
+
+
+class ResponseReader(serial.threaded.LineReader):
+    """Line framer run by serial.threaded.ReaderThread; queues non-empty lines"""
+
+    TERMINATOR = b'\n'
+
+    def __init__(self):
+        super().__init__()
+        self.rx_q = queue.Queue()
+
+    def handle_line(self, line):
+        line = line.strip()
+        if line:
+            self.rx_q.put(line)
+
+
 class Dexarm:
     """Simple wrapper for DexArm control via serial port"""
 
-    def __init__(self, port, baudrate=115200, timeout=10):
+    def __init__(self, port, baudrate=115200, timeout=10, use_broker=True):
         """
         Initialize DexArm connection
 
@@ -19,17 +160,28 @@ class Dexarm:
             port (str): Serial port (e.g., 'COM3', '/dev/ttyUSB0')
             baudrate (int): Baud rate (default: 115200)
             timeout (int): Read timeout in seconds
+            use_broker (bool): Proxy through a running dexarm_broker if one is found
         """
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
+        self.use_broker = use_broker
         self.serial = None
+        self._reader = None
+        self.rx_q = None
 
         # Connect
         self._connect()
+        self._start_reader()
 
     def _connect(self):
-        """Establish serial connection"""
+        """Establish serial connection (or attach to the broker)"""
+        if self.use_broker:
+            self.serial = connect_to_broker(self.timeout)
+            if self.serial:
+                # Broker already owns a warm connection - no reset, no startup wait
+                return
+
         try:
             self.serial = serial.Serial(
                 port=self.port,
@@ -39,18 +191,45 @@ class Dexarm:
             )
             time.sleep(2)  # Wait for connection to stabilize
 
-            # Flush buffers
-            self.serial.flushInput()
-            self.serial.flushOutput()
-
-            # Wait for startup messages
-            time.sleep(1)
-            while self.serial.in_waiting:
-                self.serial.readline()
+            # Drain startup messages until the line goes idle
+            self.serial.timeout = 0.2
+            while self.serial.readline():
+                pass
+            self.serial.timeout = self.timeout
 
         except serial.SerialException as e:
             raise ConnectionError(f"Failed to connect to DexArm on {self.port}: {e}")
 
+    def _start_reader(self):
+        """Hand line framing to a background ReaderThread"""
+        self._reader = serial.threaded.ReaderThread(self.serial, ResponseReader)
+        self._reader.start()
+        _, protocol = self._reader.connect()
+        self.rx_q = protocol.rx_q
+
+    def _read_response(self, timeout):
+        """
+        Collect response lines until 'ok' or timeout
+
+        Returns:
+            list: Lines received (ending with 'ok' unless timed out)
+        """
+        lines = []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                line = self.rx_q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            lines.append(line)
+            # If we got 'ok', we're done
+            if line == 'ok':
+                break
+        return lines
+
     def send_gcode(self, command, wait_ok=True, timeout=10):
         """
         Send a G-code command
@@ -78,28 +257,10 @@ class Dexarm:
             
             if wait_ok:
                 # Wait for response with timeout
-                start_time = time.time()
-                response_lines = []
-                
-                while (time.time() - start_time) < timeout:
-                    if self.serial.in_waiting > 0:
-                        try:
-                            line = self.serial.readline().decode('utf-8', errors='ignore').strip()
-                            if line:
-                                response_lines.append(line)
-                                # If we got 'ok', we're done
-                                if line == 'ok':
-                                    return '\n'.join(response_lines)
-                        except:
-                            pass
-                    else:
-                        time.sleep(0.01)  # Small delay to avoid busy-waiting
-                
-                # Return what we got even if no 'ok'
-                return '\n'.join(response_lines) if response_lines else ""
-            
+                return '\n'.join(self._read_response(timeout))
+
             return ""
-            
+
         except serial.SerialTimeoutException:
             raise TimeoutError(f"Write timeout sending command: {command}")
         except Exception as e:
@@ -165,51 +326,26 @@ class Dexarm:
                   Returns None if position cannot be read
         """
         try:
-            # Flush any pending data first to avoid reading stale responses
-            self.serial.reset_input_buffer()
-            self.serial.reset_output_buffer()
+            # Drop any pending lines first to avoid reading stale responses
+            while not self.rx_q.empty():
+                self.rx_q.get_nowait()
 
-            # Send M114 and wait for response
+            # Send M114 and collect the multi-line response
             self.serial.write(b"M114\n")
             self.serial.flush()  # Ensure command is sent
-            time.sleep(0.3)  # Increased wait time for full multi-line response
-
-            # Read all available lines with timeout
-            lines = []
-            timeout = time.time() + 1.0  # 1 second timeout
-            while time.time() < timeout:
-                if self.serial.in_waiting > 0:
-                    try:
-                        line = self.serial.readline().decode('utf-8', errors='ignore').strip()
-                        if line:
-                            lines.append(line)
-                            # If we got 'ok', we're done
-                            if line == 'ok':
-                                break
-                    except:
-                        pass
-                else:
-                    time.sleep(0.05)  # Small delay before checking again
+            response = '\n'.join(self._read_response(1.3))
 
             # Find the line starting with "X:" (the main position line)
-            for line in lines:
-                if line.startswith('X:'):
-                    # Parse response: "X:200.00 Y:0.00 Z:0.00 E:0.00 ..."
-                    position = {}
-                    parts = line.split()
-                    for part in parts:
-                        if ':' in part:
-                            axis, value = part.split(':', 1)
-                            axis = axis.upper()
-                            if axis in ['X', 'Y', 'Z']:
-                                try:
-                                    position[axis.lower()] = float(value)
-                                except ValueError:
-                                    pass
-
-                    # Return position if we got all three axes
-                    if 'x' in position and 'y' in position and 'z' in position:
-                        return position
+            m = _POS_RE.search(response)
+            if m:
+                try:
+                    return {
+                        'x': float(m.group(1)),
+                        'y': float(m.group(2)),
+                        'z': float(m.group(3))
+                    }
+                except ValueError:
+                    pass
 
             # If we didn't find valid position, return None to indicate failure
             return None
@@ -249,6 +385,9 @@ class Dexarm:
 
     def close(self):
         """Close serial connection"""
+        if self._reader:
+            self._reader.stop()
+            self._reader = None
         if self.serial and self.serial.is_open:
             self.serial.close()
 
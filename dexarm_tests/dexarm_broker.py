@@ -0,0 +1,116 @@
+"""
+DexArm Connection Broker
+========================
+Keeps the DexArm serial port open in one long-lived process so the test
+scripts (and the Flask app) can attach to it without paying the 2 second
+connection reset on every run, and without fighting over the COM port.
+
+Any `Dexarm(...)` created while the broker is running transparently proxies
+through it. One client is served at a time; a client that connects while
+another is attached is told the broker is busy and disconnected. Bytes are
+forwarded unchanged in both directions.
+
+Usage:
+    python dexarm_broker.py [PORT]
+
+Example:
+    python dexarm_broker.py COM3
+"""
+
+import socket
+import sys
+import threading
+import time
+
+import serial
+
+from dexarm import BROKER_ADDRESS, BROKER_BUSY, BROKER_READY, find_dexarm_port
+
+
+def _serial_to_client(ser, state):
+    """Forward everything the arm sends to the currently attached client"""
+    while True:
+        try:
+            data = ser.read(ser.in_waiting or 1)
+        except serial.SerialException as e:
+            print(f"❌ Serial read failed: {e}")
+            return
+        client = state.get('client')
+        if data and client:
+            try:
+                client.sendall(data)
+            except OSError:
+                state['client'] = None
+
+
+def _client_to_serial(client, addr, ser, state):
+    """Forward everything an attached client sends to the arm"""
+    print(f"➡️  Client attached from {addr[0]}:{addr[1]}")
+    try:
+        while True:
+            data = client.recv(4096)
+            if not data:
+                break
+            ser.write(data)
+    except OSError:
+        pass
+    finally:
+        if state.get('client') is client:
+            state['client'] = None
+        client.close()
+        print("⬅️  Client detached")
+
+
+def serve(port, baudrate=115200):
+    """Open the serial port once and relay it to socket clients"""
+    print(f"🔌 Opening {port} at {baudrate} baud...")
+    ser = serial.Serial(port=port, baudrate=baudrate, timeout=0.1, write_timeout=10)
+    time.sleep(2)  # Wait for connection to stabilize (paid once, here)
+    ser.reset_input_buffer()
+
+    state = {'client': None}
+    threading.Thread(target=_serial_to_client, args=(ser, state), daemon=True).start()
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(BROKER_ADDRESS)
+    server.listen(1)
+    print(f"✅ Broker listening on {BROKER_ADDRESS[0]}:{BROKER_ADDRESS[1]} (Ctrl+C to stop)")
+
+    try:
+        while True:
+            client, addr = server.accept()
+            try:
+                if state['client'] is not None:
+                    # Turn extra clients away now instead of leaving them in the backlog
+                    print(f"⛔ Rejected {addr[0]}:{addr[1]} (another client is attached)")
+                    client.sendall(BROKER_BUSY)
+                    client.close()
+                    continue
+                client.sendall(BROKER_READY)
+            except OSError:
+                client.close()
+                continue
+
+            state['client'] = client
+            threading.Thread(target=_client_to_serial, args=(client, addr, ser, state),
+                             daemon=True).start()
+    except KeyboardInterrupt:
+        print("\nStopping broker...")
+    finally:
+        server.close()
+        ser.close()
+
+
+def main():
+    port = sys.argv[1] if len(sys.argv) > 1 else find_dexarm_port()
+    if port is None:
+        print("❌ No DexArm found. Please specify port manually.")
+        print("Usage: python dexarm_broker.py COM3")
+        sys.exit(1)
+
+    serve(port)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,7 @@ class SettingsManager {
         this.penLiftHeight = document.getElementById('penLiftHeight');
         this.svgMethod = document.getElementById('svgMethod');
         this.maxCommands = document.getElementById('maxCommands');
+        this.edgeDetection = document.getElementById('edgeDetection');
         this.saveBtn = document.getElementById('saveSettingsBtn');
         this.resetBtn = document.getElementById('resetDefaultsBtn');
         this.statusMessage = document.getElementById('statusMessage');
@@ -38,6 +39,7 @@ class SettingsManager {
             this.penLiftHeight.value = settings.pen_lift_height || 16;
             this.svgMethod.value = settings.svg_method || 'clean_v1';
             this.maxCommands.value = settings.max_commands || 5000;
+            this.edgeDetection.value = settings.edge_detection || 'canny';
 
         } catch (error) {
             console.error('Error loading settings:', error);
@@ -51,7 +53,8 @@ class SettingsManager {
                 comfyui_url: this.comfyuiUrl.value,
                 pen_lift_height: parseInt(this.penLiftHeight.value),
                 svg_method: this.svgMethod.value,
-                max_commands: parseInt(this.maxCommands.value)
+                max_commands: parseInt(this.maxCommands.value),
+                edge_detection: this.edgeDetection.value
             };
 
             const response = await fetch('/api/settings', {
@@ -85,6 +88,7 @@ class SettingsManager {
         this.penLiftHeight.value = 16;
         this.svgMethod.value = 'clean_v1';
         this.maxCommands.value = 5000;
+        this.edgeDetection.value = 'canny';
 
         await this.saveSettings();
     }
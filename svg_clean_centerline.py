@@ -2,7 +2,7 @@
 Clean Centerline SVG Generator
 ===============================
 Extracts clean centerlines from images using morphological skeletonization.
-Avoids double lines on thick strokes by finding the medial axis.
+Avoids double lines on thick strokes by skeletonizing them.
 
 Key Features:
 - Single clean lines for thick strokes (no double outlines)
@@ -12,11 +12,46 @@ Key Features:
 
 import cv2
 import numpy as np
-from scipy import ndimage
-from skimage.morphology import skeletonize, medial_axis
-import svgwrite
+from scipy.spatial import cKDTree
+from skimage.morphology import skeletonize
 import os
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the NumPy hatch path is used instead
+    njit = None
+
+
+def _hatch_runs_kernel(mask, x, y, n, spacing, min_run, out):
+    """
+    Sweep every diagonal hatch line over a mask and record runs of hits
+
+    Writes (x0, y0, x1, y1) rows into the preallocated `out` array and
+    returns the number of runs written. Compiled with Numba when available.
+    """
+    height, width = mask.shape
+    count = 0
+    for offset in range(-n, n, spacing):
+        run_start = -1
+        for i in range(n + 1):
+            px = x + i
+            py = y + i + offset
+            if i < n and px < width and py >= 0 and py < height and mask[py, px] > 0:
+                if run_start < 0:
+                    run_start = i
+            elif run_start >= 0:
+                if i - run_start > min_run:
+                    out[count, 0] = x + run_start
+                    out[count, 1] = y + run_start + offset
+                    out[count, 2] = x + i - 1
+                    out[count, 3] = y + i - 1 + offset
+                    count += 1
+                run_start = -1
+    return count
+
+
+_hatch_runs_jit = njit(cache=True, boundscheck=False)(_hatch_runs_kernel) if njit else None
+
 
 class CleanCenterlineGenerator:
     """Generate clean SVG using centerline extraction"""
@@ -25,6 +60,10 @@ class CleanCenterlineGenerator:
         self.output_dir = 'svgs'
         os.makedirs(self.output_dir, exist_ok=True)
 
+        # Kernels reused by every _preprocess() call
+        self._kernel3 = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        self._gauss5 = cv2.getGaussianKernel(5, 1.0)
+
     def generate_all_variations(self, image_path, base_filename):
         """
         Generate clean centerline variations
@@ -44,43 +83,40 @@ class CleanCenterlineGenerator:
         height, width = img.shape
         results = {}
 
+        # Threshold/distance/skeleton work is shared by all variations
+        pre = self._preprocess(img, threshold_method='adaptive')
+
         print("\n" + "="*70)
         print("Generating Clean Centerline Variations")
         print("="*70)
 
-        # V1: Basic skeletonization with light smoothing
-        print("\nV1: Basic skeleton (light smooth, clean lines)")
-        filename = f"{base_filename}_clean_v1.svg"
-        results['clean_v1'] = self._centerline_base(
-            img, width, height, filename,
-            threshold_method='adaptive',
-            smooth_sigma=0.5,
-            min_segment_length=3,
-            add_fill=False
-        )
-
-        # V2: Moderate smoothing with longer segments
-        print("\nV2: Moderate smooth (balanced detail/cleanup)")
-        filename = f"{base_filename}_clean_v2.svg"
-        results['clean_v2'] = self._centerline_base(
-            img, width, height, filename,
-            threshold_method='adaptive',
-            smooth_sigma=0.8,
-            min_segment_length=6,
-            add_fill=False
-        )
-
-        # V3: Skeleton with connected fill for thick areas
-        print("\nV3: Skeleton + connected fill (thick areas hatched)")
-        filename = f"{base_filename}_clean_v3.svg"
-        results['clean_v3'] = self._centerline_base(
-            img, width, height, filename,
-            threshold_method='adaptive',
-            smooth_sigma=0.8,
-            min_segment_length=3,
-            add_fill=True,
-            fill_threshold=15  # Thick areas > 15px get fill
-        )
+        variations = [
+            # V1: Basic skeletonization with light smoothing
+            ('clean_v1', "V1: Basic skeleton (light smooth, clean lines)", {
+                'smooth_sigma': 0.5,
+                'min_segment_length': 3,
+                'add_fill': False
+            }),
+            # V2: Moderate smoothing with longer segments
+            ('clean_v2', "V2: Moderate smooth (balanced detail/cleanup)", {
+                'smooth_sigma': 0.8,
+                'min_segment_length': 6,
+                'add_fill': False
+            }),
+            # V3: Skeleton with connected fill for thick areas
+            ('clean_v3', "V3: Skeleton + connected fill (thick areas hatched)", {
+                'smooth_sigma': 0.8,
+                'min_segment_length': 3,
+                'add_fill': True,
+                'fill_threshold': 15  # Thick areas > 15px get fill
+            }),
+        ]
+
+        for key, label, options in variations:
+            print(f"\n{label}")
+            results[key] = self._centerline_base(
+                pre, width, height, f"{base_filename}_{key}.svg", **options
+            )
 
         print("\n" + "="*70)
         print(f"Generated {len(results)} clean centerline variations!")
@@ -88,68 +124,99 @@ class CleanCenterlineGenerator:
 
         return results
 
-    def _centerline_base(self, img, width, height, filename,
-                        threshold_method='adaptive',
-                        smooth_sigma=1.0,
-                        min_segment_length=3,
-                        add_fill=False,
-                        fill_threshold=15):
+    def _preprocess(self, img, threshold_method='adaptive'):
         """
-        Base centerline extraction method
+        Threshold, clean up and skeletonize an image once
 
         Args:
+            img: Grayscale input image
             threshold_method: 'adaptive' or 'otsu'
-            smooth_sigma: Gaussian smoothing for skeleton
-            min_segment_length: Minimum pixels to keep a segment
-            add_fill: Whether to add fill patterns for thick areas
-            fill_threshold: Minimum thickness (px) to add fill pattern
-        """
-        dwg = svgwrite.Drawing(
-            os.path.join(self.output_dir, filename),
-            size=(f'{width}px', f'{height}px'),
-            viewBox=f'0 0 {width} {height}'
-        )
 
-        # 1. Threshold the image to get binary mask
+        Returns:
+            dict: 'binary', 'distance' and 'skeleton' arrays, plus a
+                  'smoothed' cache of skeletons keyed by smooth_sigma
+        """
+        # 1. Threshold the image to get a 0/1 binary mask
+        #    (0/1 rather than 0/255 so it can be viewed as bool without a copy)
         if threshold_method == 'adaptive':
             # Adaptive threshold - good for varying lighting
-            blurred = cv2.GaussianBlur(img, (5, 5), 1.0)
+            # (its Gaussian-weighted window already smooths, so no pre-blur)
             binary = cv2.adaptiveThreshold(
-                blurred, 255,
+                img, 1,
                 cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                 cv2.THRESH_BINARY_INV,
                 21, 5
             )
         else:
             # Otsu's method - automatic global threshold
-            blurred = cv2.GaussianBlur(img, (5, 5), 1.0)
+            blurred = cv2.sepFilter2D(img, -1, self._gauss5, self._gauss5)
             _, binary = cv2.threshold(
-                blurred, 0, 255,
+                blurred, 0, 1,
                 cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU
             )
 
-        # 2. Clean up binary image
-        kernel = np.ones((2, 2), np.uint8)
-        binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-        binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
+        # 2. Clean up binary image (remove speckle noise)
+        binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, self._kernel3)
 
         # 3. Get distance transform for thickness-aware processing
-        binary_bool = binary > 0
-        distance = ndimage.distance_transform_edt(binary_bool)
+        distance = cv2.distanceTransform(binary, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+
+        # 4. Extract skeleton (thickness comes from the distance map above)
+        binary_bool = binary.view(bool)
+        skeleton = skeletonize(binary_bool, method='lee').astype(bool, copy=False)
+
+        return {
+            'binary': binary,
+            'distance': distance,
+            'skeleton': skeleton,
+            'smoothed': {}
+        }
+
+    def _smoothed_skeleton(self, pre, smooth_sigma):
+        """Clean up the shared skeleton slightly, memoized per sigma"""
+        if smooth_sigma <= 0:
+            return pre['skeleton']
+
+        if smooth_sigma not in pre['smoothed']:
+            # Bridge small gaps with a uint8 close, then thin back to 1px
+            k = max(1, int(round(smooth_sigma * 2)))
+            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * k + 1, 2 * k + 1))
+            skeleton_uint8 = np.multiply(pre['skeleton'], 255, dtype=np.uint8)
+            closed = cv2.morphologyEx(skeleton_uint8, cv2.MORPH_CLOSE, kernel)
+
+            if hasattr(cv2, 'ximgproc'):
+                # opencv-contrib-python provides a C++ Zhang-Suen thinning
+                thinned = cv2.ximgproc.thinning(closed, thinningType=cv2.ximgproc.THINNING_ZHANGSUEN) > 0
+            else:
+                thinned = skeletonize(closed > 0)
+            pre['smoothed'][smooth_sigma] = thinned
+
+        return pre['smoothed'][smooth_sigma]
+
+    def _centerline_base(self, pre, width, height, filename,
+                        smooth_sigma=1.0,
+                        min_segment_length=3,
+                        add_fill=False,
+                        fill_threshold=15):
+        """
+        Base centerline extraction method
 
-        # 4. Extract skeleton using medial axis
-        skeleton, dist_on_skel = medial_axis(binary_bool, return_distance=True)
+        Args:
+            pre: Shared preprocessing result from _preprocess()
+            smooth_sigma: Skeleton cleanup strength (gap-bridging radius ~2*sigma)
+            min_segment_length: Minimum pixels to keep a segment
+            add_fill: Whether to add fill patterns for thick areas
+            fill_threshold: Minimum thickness (px) to add fill pattern
+        """
+        parts = []  # SVG elements, joined into the file at the end
 
-        # Smooth the skeleton slightly
-        if smooth_sigma > 0:
-            skeleton_float = skeleton.astype(float)
-            skeleton_smooth = ndimage.gaussian_filter(skeleton_float, sigma=smooth_sigma)
-            skeleton = skeleton_smooth > 0.5
+        distance = pre['distance']
+        skeleton = self._smoothed_skeleton(pre, smooth_sigma)
 
         # 5. Convert skeleton to polylines
-        skeleton_uint8 = (skeleton * 255).astype(np.uint8)
+        skeleton_uint8 = skeleton.view(np.uint8)  # findContours only needs nonzero pixels
         contours, hierarchy = cv2.findContours(
-            skeleton_uint8, cv2.RETR_LIST, cv2.CHAIN_APPROX_TC89_KCOS
+            skeleton_uint8, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE
         )
 
         # 6. Process contours into polylines
@@ -159,25 +226,25 @@ class CleanCenterlineGenerator:
         for contour in contours:
             if len(contour) < min_segment_length:
                 continue
+            # Near-zero-length contours are cheaper to reject than to simplify
+            if cv2.arcLength(contour, False) < min_segment_length * 1.5:
+                continue
 
             # Simplify slightly
             epsilon = 0.5
             simplified = cv2.approxPolyDP(contour, epsilon, False)
 
             if len(simplified) > 1:
-                # Convert to plain Python ints to avoid svgwrite type errors
-                points = [(int(pt[0][0]), int(pt[0][1])) for pt in simplified]
+                # Convert to plain Python ints for SVG formatting
+                points = simplified.reshape(-1, 2).tolist()
 
                 # Check if this is a thick area (average distance > threshold)
                 if add_fill and len(contour) > 0:
                     # Sample thickness along this contour
-                    thicknesses = []
-                    for pt in contour[::max(1, len(contour)//10)]:  # Sample 10 points
-                        y, x = pt[0][1], pt[0][0]
-                        if 0 <= y < distance.shape[0] and 0 <= x < distance.shape[1]:
-                            thicknesses.append(distance[y, x])
-
-                    avg_thickness = np.mean(thicknesses) if thicknesses else 0
+                    pts = contour[::max(1, len(contour)//10), 0, :]  # Sample 10 points
+                    xs = np.clip(pts[:, 0], 0, distance.shape[1] - 1)
+                    ys = np.clip(pts[:, 1], 0, distance.shape[0] - 1)
+                    avg_thickness = float(distance[ys, xs].mean())
 
                     if avg_thickness > fill_threshold:
                         # Mark as thick area for fill pattern
@@ -192,41 +259,51 @@ class CleanCenterlineGenerator:
 
         # 7. Optimize drawing order
         if polylines:
-            ordered_polylines = self._optimize_path_order(polylines)
-
-            # Draw polylines
-            for points in ordered_polylines:
-                if len(points) > 1:
-                    dwg.add(dwg.polyline(
-                        points=points,
-                        stroke='black',
-                        fill='none',
-                        stroke_width=1.0,
-                        stroke_linecap='round',
-                        stroke_linejoin='round'
-                    ))
+            ordered_polylines, reversed_flags = self._optimize_path_order(polylines)
+
+            # Draw each polyline as its own element
+            parts.append(self._polyline_elements(ordered_polylines, stroke_width=1.0,
+                                                 reversed_flags=reversed_flags))
 
         # 8. Add fill patterns for thick areas
         if add_fill and thick_areas:
             print(f"   Adding fill to {len(thick_areas)} thick areas...")
             fill_polylines = self._generate_connected_fill(thick_areas, distance, spacing=4)
 
-            for points in fill_polylines:
-                if len(points) > 1:
-                    dwg.add(dwg.polyline(
-                        points=points,
-                        stroke='black',
-                        fill='none',
-                        stroke_width=0.8,
-                        stroke_linecap='round',
-                        stroke_linejoin='round'
-                    ))
-
-        dwg.save()
+            parts.append(self._polyline_elements(fill_polylines, stroke_width=0.8))
+
+        self._write_svg(os.path.join(self.output_dir, filename), width, height, parts)
         print(f"   Saved: {filename} ({len(polylines)} lines" +
               (f", {len(thick_areas)} filled)" if add_fill else ")"))
         return os.path.join(self.output_dir, filename)
 
+    def _polyline_elements(self, polylines, stroke_width, reversed_flags=None):
+        """Format polylines as one <polyline> element each"""
+        if reversed_flags is None:
+            reversed_flags = [False] * len(polylines)
+
+        elements = []
+        for points, reverse in zip(polylines, reversed_flags):
+            if len(points) > 1:
+                pts = reversed(points) if reverse else points
+                coords = " ".join(f"{x},{y}" for x, y in pts)
+                elements.append(
+                    f'<polyline fill="none" points="{coords}" stroke="black" '
+                    f'stroke-linecap="round" stroke-linejoin="round" stroke-width="{stroke_width}" />'
+                )
+        return "".join(elements)
+
+    def _write_svg(self, path, width, height, parts):
+        """Write SVG elements to a file as one pre-built string"""
+        header = (
+            '<?xml version="1.0" encoding="utf-8" ?>\n'
+            f'<svg baseProfile="full" height="{height}px" version="1.1" '
+            f'viewBox="0 0 {width} {height}" width="{width}px" '
+            'xmlns="http://www.w3.org/2000/svg">'
+        )
+        with open(path, 'w') as f:
+            f.write(header + "".join(parts) + '</svg>')
+
     def _generate_connected_fill(self, thick_areas, distance_map, spacing=4):
         """
         Generate connected fill patterns for thick areas
@@ -257,86 +334,86 @@ class CleanCenterlineGenerator:
             mask = np.zeros(distance_map.shape, dtype=np.uint8)
             cv2.drawContours(mask, [contour], -1, 255, -1)
 
-            # Generate diagonal hatching
-            hatch_points = []
-
             # Diagonal lines from top-left to bottom-right
-            for offset in range(-max(w, h), max(w, h), spacing):
-                line_points = []
-
-                for i in range(max(w, h)):
-                    px = x + i
-                    py = y + i + offset
-
-                    if (0 <= px < mask.shape[1] and
-                        0 <= py < mask.shape[0] and
-                        mask[py, px] > 0):
-                        line_points.append((int(px), int(py)))
-
-                if len(line_points) > 3:  # Only keep substantial lines
-                    hatch_points.extend(line_points)
-                    # Add separator to break between lines
-                    hatch_points.append(None)
-
-            # Convert to polylines (continuous where possible)
-            current_poly = []
-            for pt in hatch_points:
-                if pt is None:
-                    if len(current_poly) > 1:
-                        fill_polylines.append(current_poly)
-                    current_poly = []
-                else:
-                    current_poly.append(pt)
-
-            if len(current_poly) > 1:
-                fill_polylines.append(current_poly)
+            n = max(w, h)
+            if _hatch_runs_jit is not None:
+                max_runs = ((2 * n) // spacing + 1) * (n // 2 + 1)
+                out = np.empty((max_runs, 4), dtype=np.int32)
+                count = _hatch_runs_jit(mask, x, y, n, spacing, 3, out)
+                fill_polylines.extend(
+                    [(x0, y0), (x1, y1)] for x0, y0, x1, y1 in out[:count].tolist()
+                )
+                continue
 
-        return fill_polylines
+            i = np.arange(n)
+            px = x + i
+            for offset in range(-n, n, spacing):
+                py = y + i + offset
+                valid = (px < mask.shape[1]) & (py >= 0) & (py < mask.shape[0])
 
-    def _optimize_path_order(self, polylines):
-        """
-        Optimize drawing order using greedy nearest-neighbor
-        """
-        if not polylines:
-            return []
+                hits = np.zeros(n + 2, dtype=np.int8)
+                hits[1:-1][valid] = mask[py[valid], px[valid]] > 0
 
-        ordered = []
-        remaining = polylines.copy()
+                # Runs of consecutive hits become straight hatch segments
+                edges = np.diff(hits)
+                starts = np.flatnonzero(edges == 1)
+                ends = np.flatnonzero(edges == -1) - 1
 
-        current = remaining.pop(0)
-        ordered.append(current)
-        current_end = current[-1]
+                keep = (ends - starts + 1) > 3  # Only keep substantial lines
+                starts, ends = starts[keep], ends[keep]
+                runs = np.column_stack((px[starts], py[starts], px[ends], py[ends]))
+                fill_polylines.extend(
+                    [(x0, y0), (x1, y1)] for x0, y0, x1, y1 in runs.tolist()
+                )
 
-        while remaining:
-            min_dist = float('inf')
-            best_idx = 0
-            best_reverse = False
+        return fill_polylines
 
-            for idx, poly in enumerate(remaining):
-                dist_start = self._point_distance(current_end, poly[0])
-                if dist_start < min_dist:
-                    min_dist = dist_start
-                    best_idx = idx
-                    best_reverse = False
+    def _optimize_path_order(self, polylines):
+        """
+        Optimize drawing order using greedy nearest-neighbor
 
-                dist_end = self._point_distance(current_end, poly[-1])
-                if dist_end < min_dist:
-                    min_dist = dist_end
-                    best_idx = idx
-                    best_reverse = True
+        Endpoints of all polylines go into a KD-tree; endpoint 2i is the start
+        of polyline i and 2i+1 its end (drawn reversed).
 
-            next_poly = remaining.pop(best_idx)
-            if best_reverse:
-                next_poly = list(reversed(next_poly))
+        Returns:
+            tuple: (ordered polylines, per-polyline reversed flags). Polylines
+                   are not copied; reversal is applied when they are emitted.
+        """
+        if not polylines:
+            return [], []
+
+        n = len(polylines)
+        endpoints = np.array([[p[0], p[-1]] for p in polylines], dtype=np.float64).reshape(-1, 2)
+        tree = cKDTree(endpoints)
+        alive = np.ones(n, dtype=bool)
+
+        alive[0] = False
+        ordered = [polylines[0]]
+        reversed_flags = [False]
+        current_end = polylines[0][-1]
+
+        for _ in range(n - 1):
+            # Widen the query until it reaches an endpoint of an unused polyline
+            k = 8
+            best = None
+            while best is None:
+                k = min(k, 2 * n)
+                _, idxs = tree.query(current_end, k=k)
+                for idx in np.atleast_1d(idxs):
+                    if alive[idx // 2]:
+                        best = int(idx)
+                        break
+                k *= 2
+
+            poly_idx, best_reverse = divmod(best, 2)
+            alive[poly_idx] = False
+            next_poly = polylines[poly_idx]
 
             ordered.append(next_poly)
-            current_end = next_poly[-1]
-
-        return ordered
+            reversed_flags.append(bool(best_reverse))
+            current_end = next_poly[0] if best_reverse else next_poly[-1]
 
-    def _point_distance(self, p1, p2):
-        """Calculate Euclidean distance between two points"""
-        return np.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+        return ordered, reversed_flags
 
 
 # Global instance
@@ -4,10 +4,74 @@ Image to SVG Converter
 Converts raster images to SVG line drawings for robot arm drawing.
 """
 
+import math
 import os
+import re
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
 from PIL import Image, ImageOps, ImageEnhance, ImageFilter
-import svgwrite
+from skimage import img_as_ubyte
+from skimage.morphology import skeletonize
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the NumPy contour-hatch path is used instead
+    njit = None
+
+
+# M/L command followed by an "x,y" pair, as written by this converter
+_COORD_RE = re.compile(r'[MLml]\s*(-?\d+\.?\d*),(-?\d+\.?\d*)')
+
+
+def _f(v):
+    """Format a coordinate with at most 2 decimals (integers without '.00')"""
+    s = f"{v:.2f}"
+    return s[:-3] if s.endswith('.00') else s
+
+
+# Hatch directions are quantized to this many angles (power of two for the wrap mask)
+_ANGLE_BINS = 1024
+
+# Unit direction tables for the quantized angles; bin k holds -pi + k * 2pi / _ANGLE_BINS
+_ANGLE_TABLE = np.linspace(-np.pi, np.pi, _ANGLE_BINS, endpoint=False)
+_COS = np.cos(_ANGLE_TABLE).astype(np.float32)
+_SIN = np.sin(_ANGLE_TABLE).astype(np.float32)
+
+
+def _contour_hatch_kernel(dist, img, spacing, length, cos_lut, sin_lut, out):
+    """
+    Walk the dark grid points and write gradient-following hatch segments
+
+    Writes (x1, y1, x2, y2) rows into the preallocated `out` array and
+    returns the number of segments written. Compiled with Numba when available.
+    """
+    height, width = img.shape
+    n = cos_lut.shape[0]
+    scale = n / (2 * math.pi)
+    count = 0
+    for y in range(0, height, spacing):
+        if y == 0 or y == height - 1:
+            continue
+        for x in range(0, width, spacing):
+            if x == 0 or x == width - 1 or img[y, x] >= 100:
+                continue
+            dx = dist[y, x + 1] - dist[y, x - 1]
+            dy = dist[y + 1, x] - dist[y - 1, x]
+            k = int((math.atan2(dy, dx) + math.pi) * scale + 0.5) & (n - 1)
+            x2 = int(x + length * cos_lut[k])
+            y2 = int(y + length * sin_lut[k])
+            if 0 <= x2 < width and 0 <= y2 < height:
+                out[count, 0] = x
+                out[count, 1] = y
+                out[count, 2] = x2
+                out[count, 3] = y2
+                count += 1
+    return count
+
+
+_contour_hatch_jit = njit(cache=True, fastmath=True, boundscheck=False)(_contour_hatch_kernel) if njit else None
 
 
 class SVGConverter:
@@ -38,13 +102,27 @@ class SVGConverter:
             print("\n🎨 Generating 10 different SVG versions for comparison...")
             base = os.path.splitext(output_path)[0]
 
-            for version in range(10):
-                version_output = f"{base}_version{version}.svg"
-                try:
-                    self._generate_version(image_path, version_output, version)
-                    print(f"✅ Version {version} complete: {version_output}")
-                except Exception as e:
-                    print(f"❌ Version {version} failed: {e}")
+            # Load, equalize and edge-detect once for all versions; trace the
+            # shared Canny contours up front so every thread reuses the same
+            # contour list and path text instead of re-tracing it
+            prepared = self._prepare(image_path)
+            for low, high, epsilon in ((50, 150, 2.0), (40, 120, 2.5), (45, 135, 2.0)):
+                self._add_canny_contours([], prepared, low, high, epsilon)
+
+            # Versions are independent and each writes its own file; threads
+            # share the prepared caches and the OpenCV calls release the GIL
+            with ThreadPoolExecutor(max_workers=min(10, os.cpu_count() or 1)) as pool:
+                futures = {
+                    version: pool.submit(self._generate_version, prepared,
+                                         f"{base}_version{version}.svg", version)
+                    for version in range(10)
+                }
+                for version, future in futures.items():
+                    try:
+                        version_output = future.result()
+                        print(f"✅ Version {version} complete: {version_output}")
+                    except Exception as e:
+                        print(f"❌ Version {version} failed: {e}")
 
             print(f"\n✅ All versions generated! Main file: {output_path}")
             # Return version 8 as default (contour-following hatching with long lines)
@@ -52,88 +130,118 @@ class SVGConverter:
 
         # Single version generation - always use version 8
         print(f"Generating Version 8 (contour-following hatching)...")
-        self._generate_version(image_path, output_path, version=8)
+        self._generate_version(self._prepare(image_path), output_path, version=8)
         print(f"✅ Version 8 generated: {output_path}")
         return output_path
 
-    def _generate_version(self, image_path, output_path, version):
+    def _prepare(self, image_path):
         """
-        Generate specific version of SVG
+        Load and equalize an image once for one or more versions
 
         Args:
             image_path (str): Input image path
-            output_path (str): Output SVG path
-            version (int): Version number (0-9)
-        """
-        import cv2
-        import numpy as np
-        import svgwrite
 
+        Returns:
+            dict: 'img' (grayscale, equalized if low-contrast), plus 'canny' and 'contours' caches
+                  keyed by (low, high) and a 'contour_paths' cache keyed by
+                  (low, high, epsilon)
+        """
         # Load image
         img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        img = cv2.equalizeHist(img)  # Enhance contrast
 
-        # Create SVG
+        # Enhance contrast only on flat, low-contrast inputs; equalizing an
+        # already well-spread histogram mostly adds noise to the edge maps
+        _, stddev = cv2.meanStdDev(img)
+        if stddev[0, 0] < 40:
+            img = cv2.equalizeHist(img)
+
+        return {'img': img, 'canny': {}, 'contours': {}, 'contour_paths': {}}
+
+    def _canny(self, prepared, low, high):
+        """Canny edges of the prepared image, computed once per threshold pair"""
+        key = (low, high)
+        if key not in prepared['canny']:
+            prepared['canny'][key] = cv2.Canny(prepared['img'], low, high)
+        return prepared['canny'][key]
+
+    def _canny_contours(self, prepared, low, high):
+        """Contours of the cached Canny edges, traced once per threshold pair"""
+        key = (low, high)
+        if key not in prepared['contours']:
+            edges = self._canny(prepared, low, high)
+            prepared['contours'][key], _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        return prepared['contours'][key]
+
+    def _add_canny_contours(self, parts, prepared, low, high, epsilon):
+        """Add the Canny contour path, rendering its SVG text once per (low, high, epsilon)"""
+        key = (low, high, epsilon)
+        if key not in prepared['contour_paths']:
+            rendered = []
+            self._add_contours_to_svg(rendered, self._canny_contours(prepared, low, high), epsilon)
+            prepared['contour_paths'][key] = rendered
+        parts.extend(prepared['contour_paths'][key])
+
+    def _generate_version(self, prepared, output_path, version):
+        """
+        Generate specific version of SVG
+
+        Args:
+            prepared (dict): Preprocessed image from _prepare()
+            output_path (str): Output SVG path
+            version (int): Version number (0-9)
+        """
+        img = prepared['img']
+
+        # Collect SVG elements as strings
         height, width = img.shape
-        dwg = svgwrite.Drawing(output_path, size=(f'{width}px', f'{height}px'))
-        dwg.viewbox(width=width, height=height)
+        parts = []
 
         if version == 0:
             # Version 0: Contours with horizontal hatching in dark areas
-            edges = cv2.Canny(img, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            self._add_contours_to_svg(dwg, contours, 2.0)
+            self._add_canny_contours(parts, prepared, 50, 150, 2.0)
             # Add horizontal hatching in dark areas
-            self._add_hatching(dwg, img, 'horizontal', spacing=8)
+            self._add_hatching(parts, img, 'horizontal', spacing=8)
 
         elif version == 1:
             # Version 1: Sobel edge detection (user's favorite from old v7)
-            sobelx = cv2.Sobel(img, cv2.CV_64F, 1, 0, ksize=3)
-            sobely = cv2.Sobel(img, cv2.CV_64F, 0, 1, ksize=3)
-            edges = np.uint8(np.sqrt(sobelx**2 + sobely**2))
+            # 16-bit gradients are exact for 3x3 Sobel on uint8; magnitude in float32
+            sobelx = cv2.Sobel(img, cv2.CV_16S, 1, 0, ksize=3)
+            sobely = cv2.Sobel(img, cv2.CV_16S, 0, 1, ksize=3)
+            magnitude = cv2.magnitude(sobelx.astype(np.float32), sobely.astype(np.float32))
+            edges = cv2.convertScaleAbs(magnitude)
             _, edges = cv2.threshold(edges, 50, 255, cv2.THRESH_BINARY)
             contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            self._add_contours_to_svg(dwg, contours, 2.0)
+            self._add_contours_to_svg(parts, contours, 2.0)
 
         elif version == 2:
             # Version 2: Edges with cross-hatching in shadows
-            edges = cv2.Canny(img, 40, 120)
-            contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            self._add_contours_to_svg(dwg, contours, 2.5)
+            self._add_canny_contours(parts, prepared, 40, 120, 2.5)
             # Add cross-hatching
-            self._add_hatching(dwg, img, 'cross', spacing=10)
+            self._add_hatching(parts, img, 'cross', spacing=10)
 
         elif version == 3:
             # Version 3: Edges with diagonal scribbles in dark areas
-            edges = cv2.Canny(img, 45, 135)
-            contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            self._add_contours_to_svg(dwg, contours, 2.0)
+            self._add_canny_contours(parts, prepared, 45, 135, 2.0)
             # Add diagonal scribbles
-            self._add_scribbles(dwg, img, angle=45, density=15)
+            self._add_scribbles(parts, img, angle=45, density=15)
 
         elif version == 4:
             # Version 4: Edges with stippling/dots in shadows
-            edges = cv2.Canny(img, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            self._add_contours_to_svg(dwg, contours, 2.0)
+            self._add_canny_contours(parts, prepared, 50, 150, 2.0)
             # Add stippling
-            self._add_stippling(dwg, img, density=0.3)
+            self._add_stippling(parts, img, density=0.3)
 
         elif version == 5:
             # Version 5: Edges with concentric circles in dark areas
-            edges = cv2.Canny(img, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            self._add_contours_to_svg(dwg, contours, 2.0)
+            self._add_canny_contours(parts, prepared, 50, 150, 2.0)
             # Add circular scribbles
-            self._add_circular_scribbles(dwg, img, radius=8, spacing=20)
+            self._add_circular_scribbles(parts, img, radius=8, spacing=20)
 
         elif version == 6:
             # Version 6: Edges with wavy horizontal lines in shadows
-            edges = cv2.Canny(img, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            self._add_contours_to_svg(dwg, contours, 2.0)
+            self._add_canny_contours(parts, prepared, 50, 150, 2.0)
             # Add wavy lines
-            self._add_wavy_hatching(dwg, img, spacing=10, amplitude=3)
+            self._add_wavy_hatching(parts, img, spacing=10, amplitude=3)
 
         elif version == 7:
             # Version 7: Laplacian edges with random scribbles
@@ -141,180 +249,224 @@ class SVGConverter:
             edges = np.uint8(np.absolute(laplacian))
             _, edges = cv2.threshold(edges, 30, 255, cv2.THRESH_BINARY)
             contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            self._add_contours_to_svg(dwg, contours, 2.0)
+            self._add_contours_to_svg(parts, contours, 2.0)
             # Add random scribbles
-            self._add_scribbles(dwg, img, angle='random', density=20)
+            self._add_scribbles(parts, img, angle='random', density=20)
 
         elif version == 8:
             # Version 8: Edges with contour following hatching
-            edges = cv2.Canny(img, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            self._add_contours_to_svg(dwg, contours, 2.0)
+            self._add_canny_contours(parts, prepared, 50, 150, 2.0)
             # Add contour-following lines
-            self._add_contour_hatching(dwg, img, contours, spacing=8)
+            contours = self._canny_contours(prepared, 50, 150)
+            self._add_contour_hatching(parts, img, contours, spacing=8)
 
         elif version == 9:
             # Version 9: Thick edges with dense diagonal hatching
             img_blur = cv2.GaussianBlur(img, (3, 3), 0)
             edges = cv2.Canny(img_blur, 40, 120)
-            kernel = np.ones((3, 3), np.uint8)
-            edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel, iterations=3)
+            # A single 7x7 close equals three 3x3 iterations (3 dilates then 3 erodes)
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 7))
+            edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
             contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            self._add_contours_to_svg(dwg, contours, 2.5)
+            self._add_contours_to_svg(parts, contours, 2.5)
             # Add dense hatching
-            self._add_hatching(dwg, img, 'diagonal', spacing=6)
+            self._add_hatching(parts, img, 'diagonal', spacing=6)
 
-        dwg.save()
+        self._write_svg(output_path, width, height, parts)
         return output_path
 
-    def _add_contours_to_svg(self, dwg, contours, epsilon):
+    def _add_contours_to_svg(self, parts, contours, epsilon):
         """Add contour paths to SVG"""
-        import cv2
         min_length = 20
-        contours = [c for c in contours if cv2.arcLength(c, False) > min_length]
 
+        path_data = []
         for contour in contours:
+            if cv2.arcLength(contour, False) <= min_length:
+                continue
+
             approx = cv2.approxPolyDP(contour, epsilon, False)
             if len(approx) < 2:
                 continue
 
-            path_data = []
-            for i, point in enumerate(approx):
-                x, y = point[0]
-                if i == 0:
-                    path_data.append(f'M {x},{y}')
-                else:
-                    path_data.append(f'L {x},{y}')
-
-            if path_data:
-                path_str = ' '.join(path_data)
-                dwg.add(dwg.path(
-                    d=path_str,
-                    stroke='black',
-                    fill='none',
-                    stroke_width=1.0,
-                    stroke_linecap='round',
-                    stroke_linejoin='round'
-                ))
-
-    def _add_hatching(self, dwg, img, direction='horizontal', spacing=10):
+            # Integer contour points: "M x,y L x,y L ..." in one join
+            coords = [f'{x},{y}' for x, y in approx.reshape(-1, 2).tolist()]
+            path_data.append('M ' + ' L '.join(coords))
+
+        self._add_paths(parts, path_data, 1.0,
+                        stroke_linecap='round', stroke_linejoin='round')
+
+    def _add_paths(self, parts, path_data, stroke_width, **attrs):
+        """
+        Add one <path> per entry of path_data, all in the same style
+
+        Separate elements keep each stroke a path of its own for the parser's
+        longest-first ordering, max_commands cap and _join_nearby_paths.
+        """
+        extra = ''.join(f' {k.replace("_", "-")}="{v}"' for k, v in attrs.items())
+        style = f'fill="none" stroke="black" stroke-width="{stroke_width}"{extra}'
+        parts.extend(f'<path d="{d}" {style} />' for d in path_data)
+
+    def _add_lines(self, parts, lines, stroke_width):
+        """Add one <line> per (x1, y1, x2, y2) entry of lines"""
+        parts.extend(f'<line stroke="black" stroke-width="{stroke_width}" '
+                     f'x1="{x1}" x2="{x2}" y1="{y1}" y2="{y2}" />'
+                     for x1, y1, x2, y2 in lines)
+
+    def _write_svg(self, output_path, width, height, parts):
+        """Write collected SVG element strings to a file in one go"""
+        with open(output_path, 'w') as f:
+            f.write(
+                '<?xml version="1.0" encoding="utf-8" ?>\n'
+                f'<svg baseProfile="full" height="{height}px" version="1.1" '
+                f'viewBox="0 0 {width} {height}" width="{width}px" '
+                'xmlns="http://www.w3.org/2000/svg">'
+                + ''.join(parts) + '</svg>'
+            )
+
+    def _dark_points(self, img, spacing):
+        """
+        Grid points (every `spacing` px) that fall on dark areas
+
+        Returns:
+            tuple: (xs, ys) integer arrays in row-major order
+        """
+        ys, xs = np.nonzero(img[::spacing, ::spacing] < 100)
+        return xs * spacing, ys * spacing
+
+    def _add_hatching(self, parts, img, direction='horizontal', spacing=10):
         """Add hatching lines in dark areas"""
-        import numpy as np
         height, width = img.shape
 
-        for y in range(0, height, spacing):
-            for x in range(0, width, spacing):
-                if img[y, x] < 100:  # Dark area
-                    if direction == 'horizontal':
-                        x2 = min(x + spacing - 2, width - 1)
-                        dwg.add(dwg.line((x, y), (x2, y), stroke='black', stroke_width=0.5))
-                    elif direction == 'diagonal':
-                        x2 = min(x + spacing - 2, width - 1)
-                        y2 = min(y + spacing - 2, height - 1)
-                        dwg.add(dwg.line((x, y), (x2, y2), stroke='black', stroke_width=0.5))
-                    elif direction == 'cross':
-                        x2 = min(x + spacing - 2, width - 1)
-                        y2 = min(y + spacing - 2, height - 1)
-                        dwg.add(dwg.line((x, y), (x2, y), stroke='black', stroke_width=0.5))
-                        dwg.add(dwg.line((x, y), (x, y2), stroke='black', stroke_width=0.5))
-
-    def _add_scribbles(self, dwg, img, angle=45, density=15):
+        xs, ys = self._dark_points(img, spacing)
+        x2s = np.minimum(xs + spacing - 2, width - 1)
+        y2s = np.minimum(ys + spacing - 2, height - 1)
+
+        lines = []
+        for x, y, x2, y2 in zip(xs.tolist(), ys.tolist(), x2s.tolist(), y2s.tolist()):
+            if direction == 'horizontal':
+                lines.append((x, y, x2, y))
+            elif direction == 'diagonal':
+                lines.append((x, y, x2, y2))
+            elif direction == 'cross':
+                lines.append((x, y, x2, y))
+                lines.append((x, y, x, y2))
+
+        self._add_lines(parts, lines, 0.5)
+
+    def _add_scribbles(self, parts, img, angle=45, density=15):
         """Add scribble lines in dark areas"""
-        import numpy as np
         height, width = img.shape
 
-        for y in range(0, height, density):
-            for x in range(0, width, density):
-                if img[y, x] < 100:  # Dark area
-                    if angle == 'random':
-                        import random
-                        a = random.randint(0, 360)
-                    else:
-                        a = angle
+        xs, ys = self._dark_points(img, density)
+        if angle == 'random':
+            angles = np.random.randint(0, 361, len(xs))
+        else:
+            angles = np.full(len(xs), angle)
 
-                    length = density - 2
-                    rad = np.radians(a)
-                    x2 = int(x + length * np.cos(rad))
-                    y2 = int(y + length * np.sin(rad))
+        length = density - 2
+        rad = np.radians(angles)
+        x2s = (xs + length * np.cos(rad)).astype(int)
+        y2s = (ys + length * np.sin(rad)).astype(int)
 
-                    if 0 <= x2 < width and 0 <= y2 < height:
-                        dwg.add(dwg.line((x, y), (x2, y2), stroke='black', stroke_width=0.5))
+        inside = (x2s >= 0) & (x2s < width) & (y2s >= 0) & (y2s < height)
+        self._add_lines(parts, zip(xs[inside].tolist(), ys[inside].tolist(),
+                                   x2s[inside].tolist(), y2s[inside].tolist()), 0.5)
 
-    def _add_stippling(self, dwg, img, density=0.3):
+    def _add_stippling(self, parts, img, density=0.3):
         """Add dots in dark areas"""
-        import numpy as np
-        height, width = img.shape
+        xs, ys = self._dark_points(img, 3)
 
-        for y in range(0, height, 3):
-            for x in range(0, width, 3):
-                if img[y, x] < 100:  # Dark area
-                    import random
-                    if random.random() < density:
-                        dwg.add(dwg.circle((x, y), r=0.5, fill='black'))
+        keep = np.random.random(len(xs)) < density
+        parts.extend(f'<circle cx="{x}" cy="{y}" fill="black" r="0.5" />'
+                     for x, y in zip(xs[keep].tolist(), ys[keep].tolist()))
 
-    def _add_circular_scribbles(self, dwg, img, radius=8, spacing=20):
+    def _add_circular_scribbles(self, parts, img, radius=8, spacing=20):
         """Add small circular scribbles in dark areas"""
-        import numpy as np
-        height, width = img.shape
+        xs, ys = self._dark_points(img, spacing)
 
-        for y in range(0, height, spacing):
-            for x in range(0, width, spacing):
-                if img[y, x] < 100:  # Dark area
-                    dwg.add(dwg.circle((x, y), r=radius * 0.5,
-                                     stroke='black', fill='none', stroke_width=0.5))
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            parts.append(f'<circle cx="{x}" cy="{y}" fill="none" r="{radius * 0.5}" '
+                         'stroke="black" stroke-width="0.5" />')
 
-    def _add_wavy_hatching(self, dwg, img, spacing=10, amplitude=3):
+    def _add_wavy_hatching(self, parts, img, spacing=10, amplitude=3):
         """Add wavy horizontal lines in dark areas"""
-        import numpy as np
         height, width = img.shape
 
+        # Sample columns and their wave offsets are the same for every row
+        xs = np.arange(0, width, 2)
+        wave_offsets = amplitude * np.sin(xs * 0.1)
+        x_list = xs.tolist()
+
+        path_data = []
         for y in range(0, height, spacing):
-            path_data = []
-            in_dark_region = False
-
-            for x in range(0, width, 2):
-                if img[y, x] < 100:  # Dark area
-                    wave_y = y + amplitude * np.sin(x * 0.1)
-                    if not in_dark_region:
-                        path_data.append(f'M {x},{wave_y}')
-                        in_dark_region = True
-                    else:
-                        path_data.append(f'L {x},{wave_y}')
-                else:
-                    in_dark_region = False
-
-            if path_data:
-                path_str = ' '.join(path_data)
-                dwg.add(dwg.path(d=path_str, stroke='black', fill='none', stroke_width=0.5))
-
-    def _add_contour_hatching(self, dwg, img, contours, spacing=8):
+            # Runs of consecutive dark samples become one wavy stroke each
+            dark = img[y, xs] < 100  # Dark area
+            edges = np.diff(dark.astype(np.int8), prepend=0, append=0)
+            starts = np.flatnonzero(edges == 1)
+            ends = np.flatnonzero(edges == -1)
+            if not len(starts):
+                continue
+
+            # One path per row, one M/L stroke per run
+            wave_ys = (y + wave_offsets).tolist()
+            row_data = []
+            for s, e in zip(starts.tolist(), ends.tolist()):
+                row_data.append(f'M {x_list[s]},{_f(wave_ys[s])}')
+                row_data.extend(f'L {x_list[k]},{_f(wave_ys[k])}' for k in range(s + 1, e))
+            path_data.append(' '.join(row_data))
+
+        self._add_paths(parts, path_data, 0.5)
+
+    def _add_contour_hatching(self, parts, img, contours, spacing=8):
         """Add hatching that follows contours in dark areas"""
-        import cv2
-        import numpy as np
+        # Create a distance transform from edges (drawn as 0 on a white canvas)
+        edge_img = np.full_like(img, 255)
+        cv2.drawContours(edge_img, contours, -1, 0, 1)
+        dist_transform = cv2.distanceTransform(edge_img, cv2.DIST_L2, 3)
+
+        if _contour_hatch_jit is not None:
+            length = (spacing - 2) * 3
+            max_points = ((img.shape[0] - 1) // spacing + 1) * ((img.shape[1] - 1) // spacing + 1)
+            out = np.empty((max_points, 4), dtype=np.int32)
+            count = _contour_hatch_jit(dist_transform, img, spacing, length, _COS, _SIN, out)
+            segments = out[:count]
+        else:
+            segments = self._contour_hatch_segments(dist_transform, img, spacing)
+        self._add_lines(parts, segments.tolist(), 0.5)
 
-        # Create a distance transform from edges
-        edge_img = np.zeros_like(img)
-        cv2.drawContours(edge_img, contours, -1, 255, 1)
-        dist_transform = cv2.distanceTransform(cv2.bitwise_not(edge_img), cv2.DIST_L2, 3)
+    def _contour_hatch_segments(self, dist_transform, img, spacing):
+        """
+        Hatch segments that follow the distance-transform gradient in dark areas
+
+        Args:
+            dist_transform: Distance to the nearest edge (float32)
+            img: Grayscale image
+            spacing: Grid spacing in pixels
 
+        Returns:
+            ndarray: (N, 4) int array of (x1, y1, x2, y2) segments
+        """
         height, width = img.shape
 
-        for y in range(0, height, spacing):
-            for x in range(0, width, spacing):
-                if img[y, x] < 100:  # Dark area
-                    # Calculate gradient direction from distance transform
-                    if x > 0 and x < width-1 and y > 0 and y < height-1:
-                        dx = dist_transform[y, x+1] - dist_transform[y, x-1]
-                        dy = dist_transform[y+1, x] - dist_transform[y-1, x]
-                        angle = np.arctan2(dy, dx)
-
-                        # 3x longer lines for better shading effect
-                        length = (spacing - 2) * 3
-                        x2 = int(x + length * np.cos(angle))
-                        y2 = int(y + length * np.sin(angle))
-
-                        if 0 <= x2 < width and 0 <= y2 < height:
-                            dwg.add(dwg.line((x, y), (x2, y2), stroke='black', stroke_width=0.5))
+        # Dark grid points away from the border (gradient needs both neighbours)
+        xs, ys = self._dark_points(img, spacing)
+        interior = (xs > 0) & (xs < width - 1) & (ys > 0) & (ys < height - 1)
+        xs, ys = xs[interior], ys[interior]
+
+        # Central-difference gradient, gathered only at the sampled points
+        dx = dist_transform[ys, xs + 1] - dist_transform[ys, xs - 1]
+        dy = dist_transform[ys + 1, xs] - dist_transform[ys - 1, xs]
+        angles = np.arctan2(dy, dx)
+
+        # 3x longer lines for better shading effect
+        length = (spacing - 2) * 3
+        bins = (np.rint((angles + np.pi) * (_ANGLE_BINS / (2 * np.pi))).astype(np.int32)
+                & (_ANGLE_BINS - 1))
+        x2s = (xs + length * _COS[bins]).astype(int)
+        y2s = (ys + length * _SIN[bins]).astype(int)
+
+        inside = (x2s >= 0) & (x2s < width) & (y2s >= 0) & (y2s < height)
+        return np.column_stack((xs[inside], ys[inside], x2s[inside], y2s[inside]))
 
     def _convert_with_potrace(self, image_path, output_path):
         """
@@ -387,11 +539,6 @@ class SVGConverter:
         Returns:
             str: Output SVG path
         """
-        import cv2
-        import numpy as np
-        from skimage.morphology import skeletonize
-        from skimage import img_as_ubyte
-
         print(f"Converting {image_path} to SVG using skeletonization...")
 
         # Load image
@@ -430,10 +577,9 @@ class SVGConverter:
 
         print(f"After filtering: {len(contours)} paths")
 
-        # Create SVG
+        # Collect SVG elements as strings
         height, width = img.shape
-        dwg = svgwrite.Drawing(output_path, size=(f'{width}px', f'{height}px'))
-        dwg.viewbox(width=width, height=height)
+        parts = []
 
         # Convert contours to SVG paths with aggressive simplification
         for contour in contours:
@@ -445,28 +591,15 @@ class SVGConverter:
             if len(approx) < 2:
                 continue
 
-            # Build path data
-            path_data = []
-            for i, point in enumerate(approx):
-                x, y = point[0]
-                if i == 0:
-                    path_data.append(f'M {x},{y}')  # Move to start
-                else:
-                    path_data.append(f'L {x},{y}')  # Line to point
+            # Build path data: move to start, then line to each point
+            coords = [f'{x},{y}' for x, y in approx.reshape(-1, 2).tolist()]
+            path_data = ['M ' + ' L '.join(coords)]
 
             # Create path element
-            if path_data:
-                path_str = ' '.join(path_data)
-                dwg.add(dwg.path(
-                    d=path_str,
-                    stroke='black',
-                    fill='none',
-                    stroke_width=1.5,
-                    stroke_linecap='round',
-                    stroke_linejoin='round'
-                ))
-
-        dwg.save()
+            self._add_paths(parts, path_data, 1.5,
+                            stroke_linecap='round', stroke_linejoin='round')
+
+        self._write_svg(output_path, width, height, parts)
         print(f"SVG saved with {len(contours)} clean stroke paths")
         return output_path
 
@@ -488,8 +621,10 @@ class SVGConverter:
         if output_path is None:
             output_path = svg_path.replace('.svg', '_optimized.svg')
 
-        import xml.etree.ElementTree as ET
-        import math
+        try:
+            from lxml import etree as ET  # C parser/serializer, much faster on large SVGs
+        except ImportError:
+            import xml.etree.ElementTree as ET
 
         # Parse the SVG
         tree = ET.parse(svg_path)
@@ -547,7 +682,7 @@ class SVGConverter:
         self._join_nearby_paths(root)
 
         # Save optimized SVG
-        tree.write(output_path, encoding='unicode', xml_declaration=True)
+        tree.write(output_path, encoding='utf-8', xml_declaration=True)
         print(f"✅ Optimized SVG saved: {output_path}")
 
         return output_path
@@ -564,17 +699,21 @@ class SVGConverter:
         # Rotation matrix for 90° clockwise: (x, y) -> (y, width - x)
         # We use a transform attribute for simplicity
 
-        # Find all path elements
-        for elem in root.iter():
-            if elem.tag.endswith('path'):
-                # Add transform to rotate 90° clockwise around center
-                # rotate(90, cx, cy) where cx, cy is the center
-                transform = f"rotate(90 {width/2} {height/2})"
-                existing_transform = elem.get('transform', '')
-                if existing_transform:
-                    elem.set('transform', f"{existing_transform} {transform}")
-                else:
-                    elem.set('transform', transform)
+        # Add transform to rotate 90° clockwise around center
+        # rotate(90, cx, cy) where cx, cy is the center
+        transform = f"rotate(90 {_f(width / 2)} {_f(height / 2)})"
+        for elem in self._path_elements(root):
+            existing_transform = elem.get('transform', '')
+            if existing_transform:
+                elem.set('transform', f"{existing_transform} {transform}")
+            else:
+                elem.set('transform', transform)
+
+    def _path_elements(self, root):
+        """All <path> elements below root, matched by qualified tag (no per-node string checks)"""
+        # '{http://www.w3.org/2000/svg}svg' -> '{http://www.w3.org/2000/svg}path'
+        path_tag = root.tag[:-3] + 'path' if root.tag.endswith('svg') else 'path'
+        return root.findall(f'.//{path_tag}')
 
     def _join_nearby_paths(self, root):
         """
@@ -583,15 +722,13 @@ class SVGConverter:
         Args:
             root: SVG root element
         """
-        import re
-
         # Extract all path elements
         paths = []
-        for elem in root.iter():
-            if elem.tag.endswith('path'):
-                d = elem.get('d')
-                if d:
-                    paths.append({'elem': elem, 'd': d})
+        for elem in self._path_elements(root):
+            d = elem.get('d')
+            # Only unfilled strokes are joined; a filled shape would be redrawn as an outline
+            if d and elem.get('fill', 'none') == 'none':
+                paths.append({'elem': elem, 'd': d})
 
         if len(paths) < 2:
             return
@@ -612,59 +749,76 @@ class SVGConverter:
         threshold = 5.0
         joined_count = 0
 
-        i = 0
-        while i < len(path_data):
-            j = i + 1
-            while j < len(path_data):
-                # Check if end of path i is near start of path j
-                dist = self._distance(path_data[i]['end'], path_data[j]['start'])
-                if dist < threshold:
-                    # Join path j to path i
-                    path_data[i]['d'] = self._join_path_strings(path_data[i]['d'], path_data[j]['d'])
-                    path_data[i]['end'] = path_data[j]['end']
+        # Bucket path starts into a grid of threshold-sized cells, so each end
+        # only has to be compared against starts in the 3x3 neighbouring cells
+        def cell(point):
+            return (int(point[0] // threshold), int(point[1] // threshold))
 
-                    # Remove path j from SVG
-                    root.remove(path_data[j]['elem'])
+        grid = {}
+        for idx, p in enumerate(path_data):
+            grid.setdefault(cell(p['start']), []).append(idx)
 
-                    # Update path i in SVG
-                    path_data[i]['elem'].set('d', path_data[i]['d'])
+        alive = [True] * len(path_data)
+        grown = set()
 
-                    # Remove path j from our list
-                    path_data.pop(j)
-                    joined_count += 1
-                    continue  # Don't increment j, check the next path
+        for i in range(len(path_data)):
+            if not alive[i]:
+                continue
 
-                j += 1
-            i += 1
+            # Like a linear scan, each search resumes after the last joined
+            # path instead of going back to the paths right after i
+            after = i
+            while True:
+                # Find the earliest path past `after` whose start is near the end of path i
+                end = path_data[i]['end']
+                gx, gy = cell(end)
+                best = None
+                for cx in (gx - 1, gx, gx + 1):
+                    for cy in (gy - 1, gy, gy + 1):
+                        for j in grid.get((cx, cy), ()):
+                            if j > after and (best is None or j < best) and \
+                                    self._distance(end, path_data[j]['start']) < threshold:
+                                best = j
+                if best is None:
+                    break
+
+                j = after = best
+                # Join path j to path i
+                path_data[i]['d'] = self._join_path_strings(path_data[i]['d'], path_data[j]['d'])
+                path_data[i]['end'] = path_data[j]['end']
+
+                # Remove path j from the grid; the SVG is updated once at the end
+                grid[cell(path_data[j]['start'])].remove(j)
+                alive[j] = False
+                grown.add(i)
+                joined_count += 1
+
+        # Write each extended path once and drop all merged paths in one pass
+        for i in grown:
+            path_data[i]['elem'].set('d', path_data[i]['d'])
+        dead = {id(p['elem']) for p, keep in zip(path_data, alive) if not keep}
+        if dead:
+            for parent in root.iter():
+                if any(id(child) in dead for child in parent):
+                    parent[:] = [child for child in parent if id(child) not in dead]
 
         if joined_count > 0:
             print(f"✅ Joined {joined_count} path segments")
 
     def _extract_path_endpoints(self, d):
         """Extract start and end coordinates from path data"""
-        import re
-
-        # Find all coordinates in the path
-        # Match M, L commands and their coordinates
-        coords = []
-        parts = d.split()
-
-        i = 0
-        while i < len(parts):
-            part = parts[i]
-            if part in ['M', 'L', 'm', 'l']:
-                # Next part should be coordinates
-                if i + 1 < len(parts):
-                    coord_str = parts[i + 1]
-                    if ',' in coord_str:
-                        x, y = coord_str.split(',')
-                        coords.append((float(x), float(y)))
-                i += 2
-            else:
-                i += 1
-
-        if len(coords) >= 2:
-            return {'start': coords[0], 'end': coords[-1]}
+        # Only a single open subpath can be continued from its last point
+        if d.count('M') + d.count('m') > 1 or 'Z' in d or 'z' in d:
+            return None
+
+        # Find all M/L coordinates in the path in one scan
+        matches = _COORD_RE.findall(d)
+
+        if len(matches) >= 2:
+            return {
+                'start': (float(matches[0][0]), float(matches[0][1])),
+                'end': (float(matches[-1][0]), float(matches[-1][1]))
+            }
         return None
 
     def _distance(self, p1, p2):
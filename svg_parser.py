@@ -6,15 +6,252 @@ Parses SVG files and converts paths to DexArm drawing commands.
 
 import xml.etree.ElementTree as ET
 import re
+import numpy as np
 from svg.path import parse_path
-from svg.path.path import Line, Move, Close, CubicBezier, QuadraticBezier, Arc
+from svg.path.path import Path, Line, Move, Close, CubicBezier, QuadraticBezier, Arc
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; curves are sampled with NumPy instead
+    njit = None
+
+# Path data made only of absolute M/L commands, as written by this project's
+# converters ("M x,y L x,y ..." or "Mx,y Lx,y ..."); parsed without svg.path's tokenizer
+# Each number has exactly one way to match, so a long path that fails to
+# match (e.g. a stray command letter) is rejected without backtracking blow-up
+_NUM = r'-?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?'
+_ML_PATH_RE = re.compile(rf'\s*M\s*{_NUM}[\s,]+{_NUM}(?:\s*[ML]\s*{_NUM}[\s,]+{_NUM})*\s*')
+_ML_CMD_RE = re.compile(rf'([ML])\s*({_NUM})[\s,]+({_NUM})')
+
+# svgwrite writes polyline points as "(x1, y1) (x2, y2) ..."; strip the
+# parentheses and turn commas into separators in a single pass
+_POLYLINE_TRANS = str.maketrans({'(': None, ')': None, ',': ' '})
+
+# Curves are drawn as polylines through this many evenly spaced t values
+_CURVE_T = np.linspace(0.0, 1.0, 21)
+
+
+def _sample_curve(segment):
+    """
+    Sample a curve segment at every _CURVE_T in one vectorized evaluation
+
+    Args:
+        segment: CubicBezier, QuadraticBezier or Arc
+
+    Returns:
+        ndarray: Complex points (x + yj), one per t value
+    """
+    t = _CURVE_T
+    mt = 1.0 - t
+    if isinstance(segment, CubicBezier):
+        # Cubic Bernstein polynomial on the control points
+        return (mt**3 * segment.start + 3 * mt**2 * t * segment.control1 +
+                3 * mt * t**2 * segment.control2 + t**3 * segment.end)
+    if isinstance(segment, QuadraticBezier):
+        return mt**2 * segment.start + 2 * mt * t * segment.control + t**2 * segment.end
+    # Arcs have no closed polynomial form; evaluate svg.path's point() per t
+    return np.frompyfunc(segment.point, 1, 1)(t).astype(complex)
+
+
+def _bezier_controls(segment):
+    """
+    Cubic control points of a Bezier segment (quadratics are degree-elevated)
+
+    Returns:
+        tuple: Four complex control points
+    """
+    if isinstance(segment, CubicBezier):
+        return segment.start, segment.control1, segment.control2, segment.end
+    # A quadratic is exactly the cubic with controls 2/3 of the way to its control point
+    p0, p1, p2 = segment.start, segment.control, segment.end
+    return p0, p0 + (p1 - p0) * (2 / 3), p2 + (p1 - p2) * (2 / 3), p2
+
+
+def _bezier_kernel(p0x, p0y, p1x, p1y, p2x, p2y, p3x, p3y, scale, offset_x, offset_y, out_x, out_y):
+    """
+    Sample a cubic Bezier at len(out_x) evenly spaced t values, already
+    scaled and offset into machine coordinates. Compiled with Numba when available.
+    """
+    n = out_x.shape[0] - 1
+    for i in range(n + 1):
+        t = i / n
+        mt = 1.0 - t
+        b0 = mt * mt * mt
+        b1 = 3.0 * mt * mt * t
+        b2 = 3.0 * mt * t * t
+        b3 = t * t * t
+        out_x[i] = (b0 * p0x + b1 * p1x + b2 * p2x + b3 * p3x) * scale + offset_x
+        out_y[i] = (b0 * p0y + b1 * p1y + b2 * p2y + b3 * p3y) * scale + offset_y
+
+
+_bezier_jit = njit(cache=True, fastmath=True)(_bezier_kernel) if njit else None
+
+
+def _length_value(value, default=100.0):
+    """
+    Numeric part of an SVG length such as '100px', '100.5mm' or '1.2e3'
+
+    Scans the leading number characters, then backs off until the prefix
+    parses, so a unit starting with 'e' ('10em', '10ex') is not taken as
+    an exponent. Returns default when there is no leading number.
+    """
+    value = value.strip()
+    end = 0
+    while end < len(value) and (value[end].isdigit() or value[end] in '.-+eE'):
+        end += 1
+    while end:
+        try:
+            return float(value[:end])
+        except ValueError:
+            end -= 1
+    return default
+
+
+def _polyline_path(points):
+    """
+    Build a Path of straight segments directly from points
+
+    Args:
+        points (list): Complex points (x + yj), at least one
+
+    Returns:
+        Path: Move to the first point, then one Line per consecutive pair
+    """
+    return Path(Move(points[0]), *[Line(a, b) for a, b in zip(points, points[1:])])
+
+
+def _parse_d(d):
+    """
+    Parse path data, building M/L-only data directly and falling back to parse_path
+
+    Args:
+        d (str): SVG path data
+
+    Returns:
+        Path: Parsed path
+    """
+    if not _ML_PATH_RE.fullmatch(d):
+        return parse_path(d)
+
+    segments = []
+    current = None
+    for cmd, x, y in _ML_CMD_RE.findall(d):
+        point = complex(float(x), float(y))
+        if cmd == 'M':
+            segments.append(Move(point))
+        else:
+            segments.append(Line(current, point))
+        current = point
+    return Path(*segments)
+
+
+# Command type codes stored in DrawingCommands.type
+MOVE = 0
+DRAW = 1
+_TYPE_NAMES = ('move', 'draw')
+
+# Kinds of pre-sampled path points (see SVGPathParser._sample_paths)
+_MOVE_POINT = 0     # Move segment end: pen-up move
+_LINE_POINT = 1     # Line/Close end: drawn, clipped to the drawing area
+_CURVE_START = 2    # First sample of a curve: drawn, never clipped
+_CURVE_POINT = 3    # Remaining curve samples
+
+# svg.path segment class -> kind of the point(s) it contributes (curves: _CURVE_START)
+_SEGMENT_KINDS = {
+    Move: _MOVE_POINT,
+    Line: _LINE_POINT,
+    Close: _LINE_POINT,
+    CubicBezier: _CURVE_START,
+    QuadraticBezier: _CURVE_START,
+    Arc: _CURVE_START,
+}
+
+
+class DrawingCommands:
+    """
+    Drawing commands stored as parallel NumPy arrays (one entry per command):
+    uint8 type codes, float32 x/y/z and int32 feedrates
+
+    Iterating or indexing yields the classic command dicts, so callers that
+    loop over commands keep working; bulk operations can use the arrays.
+    """
+
+    def __init__(self, kind, x, y, z, feedrate):
+        self.type = kind
+        self.x = x
+        self.y = y
+        self.z = z
+        self.feedrate = feedrate
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Pack (type, x, y, z, feedrate) tuples into arrays
+
+        Args:
+            rows (list): Command tuples in drawing order
+
+        Returns:
+            DrawingCommands: Packed commands
+        """
+        table = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        return cls(table[:, 0].astype(np.uint8), table[:, 1].astype(np.float32),
+                   table[:, 2].astype(np.float32), table[:, 3].astype(np.float32),
+                   table[:, 4].astype(np.int32))
+
+    def __len__(self):
+        return len(self.type)
+
+    def __getitem__(self, i):
+        return {
+            'type': _TYPE_NAMES[self.type[i]],
+            'x': float(self.x[i]),
+            'y': float(self.y[i]),
+            'z': float(self.z[i]),
+            'feedrate': int(self.feedrate[i])
+        }
+
+    def __iter__(self):
+        # Lazily yield dicts (a literal per row is the cheapest way to build
+        # them) from columns converted to Python scalars in bulk
+        names = np.array(_TYPE_NAMES, dtype=object)[self.type].tolist()
+        return ({'type': t, 'x': x, 'y': y, 'z': z, 'feedrate': f}
+                for t, x, y, z, f in zip(names, self.x.tolist(), self.y.tolist(),
+                                         self.z.tolist(), self.feedrate.tolist()))
+
+    def in_bounds(self, drawing_area):
+        """
+        Vectorized bounds check for every command
+
+        Returns:
+            ndarray: Boolean mask, True where (x, y) lies inside drawing_area
+        """
+        return ((self.x >= drawing_area['x_min']) & (self.x <= drawing_area['x_max']) &
+                (self.y >= drawing_area['y_min']) & (self.y <= drawing_area['y_max']))
+
+    def to_dict_list(self):
+        """
+        Convert to the list-of-dicts form
+
+        Returns:
+            list: [{'type': 'move'|'draw', 'x': float, 'y': float, 'z': float, 'feedrate': int}, ...]
+        """
+        return list(self)
 
 
 class SVGPathParser:
     """Parse SVG and convert to DexArm drawing commands"""
 
+    # Local SVG tag name -> handler method
+    _TAG_HANDLERS = {
+        'path': '_handle_path',
+        'polyline': '_handle_polyline',
+        'line': '_handle_line',
+    }
+
     def __init__(self):
         self.paths = []
+        self.samples = None
         self.viewbox = None
         self.width = None
         self.height = None
@@ -29,19 +266,20 @@ class SVGPathParser:
         Returns:
             list: List of path segments ready for drawing
         """
-        tree = ET.parse(svg_path)
-        root = tree.getroot()
-
-        # Extract viewBox or width/height
-        self._extract_dimensions(root)
-
         # IMPORTANT: Clear previous paths to avoid caching
         self.paths = []
         self.polyline_count = 0  # Debug counter
-        self._extract_paths_recursive(root)
+        self._extract_paths(svg_path)
 
-        # Sort paths by length (longest first) for better drawing efficiency
-        self.paths.sort(key=lambda p: p.length(), reverse=True)
+        # Sort paths by length (longest first) for better drawing efficiency.
+        # Lengths are computed once each; a loose curve tolerance is plenty
+        # for ordering and skips most of svg.path's recursive subdivision
+        keyed = [(p.length(error=1e-3), p) for p in self.paths]
+        keyed.sort(key=lambda kv: kv[0], reverse=True)
+        self.paths = [p for _, p in keyed]
+
+        # Sample curves once here; conversions only scale, offset and clip
+        self._sample_paths()
 
         print(f"Parsed SVG: {len(self.paths)} paths found (sorted longest first)")
         print(f"  (Parsed {self.polyline_count} polylines)")
@@ -70,76 +308,136 @@ class SVGPathParser:
         height_str = root.get('height', '100')
 
         # Strip 'px' or other units
-        self.width = float(re.sub(r'[^0-9.]', '', width_str))
-        self.height = float(re.sub(r'[^0-9.]', '', height_str))
-
-    def _extract_paths_recursive(self, element):
-        """Recursively extract path and line elements from SVG"""
-        # Handle namespace for SVG
-        ns = {'svg': 'http://www.w3.org/2000/svg'}
-
-        # Check if this element is a path
-        if element.tag.endswith('path'):
-            d = element.get('d')
-            if d:
-                try:
-                    parsed = parse_path(d)
-                    self.paths.append(parsed)
-                except Exception as e:
-                    print(f"WARNING: Failed to parse path: {e}")
-
-        # Check if this element is a polyline (MUST check BEFORE 'line' since 'polyline' ends with 'line')
-        elif element.tag.endswith('polyline'):
-            try:
-                self.polyline_count += 1
-                points_str = element.get('points', '')
-                if points_str:
-                    # svgwrite outputs points as: "(x1, y1) (x2, y2) (x3, y3)..."
-                    # Need to clean up parentheses and commas
-                    points_str = points_str.replace('(', '').replace(')', '').replace(',', ' ')
-                    coords = points_str.split()
-
-                    if len(coords) >= 4:  # At least 2 points (x,y pairs)
-                        # Build path string: M x1,y1 L x2,y2 L x3,y3...
-                        path_parts = []
-                        for i in range(0, len(coords) - 1, 2):
-                            x = coords[i]
-                            y = coords[i + 1]
-                            if i == 0:
-                                path_parts.append(f"M {x},{y}")
-                            else:
-                                path_parts.append(f"L {x},{y}")
-
-                        path_str = " ".join(path_parts)
-                        parsed = parse_path(path_str)
-                        self.paths.append(parsed)
-            except Exception as e:
-                print(f"WARNING: Failed to parse polyline: {e}")
+        self.width = _length_value(width_str)
+        self.height = _length_value(height_str)
 
-        # Check if this element is a line (from edge detection SVG)
-        # NOTE: Must check AFTER polyline since 'polyline' ends with 'line'
-        elif element.tag.endswith('line') and not element.tag.endswith('polyline'):
+    def _extract_paths(self, svg_path):
+        """
+        Stream path, polyline and line elements out of an SVG file
+
+        The file is read with iterparse in a single pass: dimensions come from
+        the root's start tag, every other element is handled when it closes
+        and then cleared, so attributes and path data do not pile up in memory.
+        """
+        # Dispatch on the local tag name (namespace stripped), so 'polyline'
+        # and 'line' can no longer be confused by suffix matching. The handler
+        # for each distinct qualified tag is resolved once, so every further
+        # element costs a single dict lookup
+        by_tag = {}
+        root_seen = False
+        for event, element in ET.iterparse(svg_path, events=('start', 'end')):
+            if event == 'start':
+                if not root_seen:
+                    # Extract viewBox or width/height
+                    self._extract_dimensions(element)
+                    root_seen = True
+                continue
+
+            tag = element.tag
+            try:
+                handler = by_tag[tag]
+            except KeyError:
+                handler = None
+                if isinstance(tag, str):  # Skip comments and processing instructions
+                    local = tag[tag.rfind('}') + 1:]
+                    method = self._TAG_HANDLERS.get(local)
+                    handler = method and getattr(self, method)
+                by_tag[tag] = handler
+            if handler:
+                handler(element)
+            element.clear()
+
+    def _handle_path(self, element):
+        """Parse a <path> element"""
+        d = element.get('d')
+        if d:
             try:
-                x1 = float(element.get('x1', 0))
-                y1 = float(element.get('y1', 0))
-                x2 = float(element.get('x2', 0))
-                y2 = float(element.get('y2', 0))
-
-                # Skip very tiny lines (less than 1 pixel)
-                line_length = ((x2 - x1)**2 + (y2 - y1)**2)**0.5
-                if line_length < 1:
-                    return
-
-                # Convert line to path format: "M x1,y1 L x2,y2"
-                path_str = f"M {x1},{y1} L {x2},{y2}"
-                parsed = parse_path(path_str)
+                parsed = _parse_d(d)
                 self.paths.append(parsed)
             except Exception as e:
-                print(f"WARNING: Failed to parse line: {e}")
+                print(f"WARNING: Failed to parse path: {e}")
+
+    def _handle_polyline(self, element):
+        """Parse a <polyline> element"""
+        try:
+            self.polyline_count += 1
+            points_str = element.get('points', '')
+            if points_str:
+                coords = list(map(float, points_str.translate(_POLYLINE_TRANS).split()))
+
+                if len(coords) >= 4:  # At least 2 points (x,y pairs)
+                    # Build the path directly: M x1,y1 L x2,y2 L x3,y3...
+                    points = list(map(complex, coords[0::2], coords[1::2]))
+                    self.paths.append(_polyline_path(points))
+        except Exception as e:
+            print(f"WARNING: Failed to parse polyline: {e}")
+
+    def _handle_line(self, element):
+        """Parse a <line> element (from edge detection SVG)"""
+        try:
+            x1 = float(element.get('x1', 0))
+            y1 = float(element.get('y1', 0))
+            x2 = float(element.get('x2', 0))
+            y2 = float(element.get('y2', 0))
+
+            # Skip very tiny lines (less than 1 pixel)
+            line_length = ((x2 - x1)**2 + (y2 - y1)**2)**0.5
+            if line_length < 1:
+                return
+
+            # Convert line to a path: M x1,y1 L x2,y2
+            self.paths.append(_polyline_path([complex(x1, y1), complex(x2, y2)]))
+        except Exception as e:
+            print(f"WARNING: Failed to parse line: {e}")
+
+    def _sample_paths(self):
+        """
+        Flatten every parsed path into one array of SVG-space points
+
+        Move/Line/Close segments contribute their end point, curves one point
+        per _CURVE_T. Fills self.samples with parallel arrays 'x', 'y',
+        'kind' (point kind) and 'path' (index into self.paths).
+        """
+        xs, ys, kinds, owners = [], [], [], []
+        curve_kinds = [_CURVE_START] + [_CURVE_POINT] * (len(_CURVE_T) - 1)
 
-        # Check children
-        for child in element:
-            self._extract_paths_recursive(child)
+        # Reused output buffers for the compiled Bezier sampler
+        out_x = np.empty(len(_CURVE_T))
+        out_y = np.empty(len(_CURVE_T))
+
+        for idx, path in enumerate(self.paths):
+            count = len(kinds)
+            for segment in path:
+                # One dict lookup on the exact class instead of isinstance chains
+                point_kind = _SEGMENT_KINDS.get(type(segment))
+                if point_kind is None:
+                    continue
+
+                if point_kind != _CURVE_START:
+                    xs.append(segment.end.real)
+                    ys.append(segment.end.imag)
+                    kinds.append(point_kind)
+
+                else:
+                    if _bezier_jit is not None and type(segment) is not Arc:
+                        p0, p1, p2, p3 = _bezier_controls(segment)
+                        _bezier_jit(p0.real, p0.imag, p1.real, p1.imag, p2.real, p2.imag,
+                                    p3.real, p3.imag, 1.0, 0.0, 0.0, out_x, out_y)
+                        xs.extend(out_x.tolist())
+                        ys.extend(out_y.tolist())
+                    else:
+                        points = _sample_curve(segment)
+                        xs.extend(points.real.tolist())
+                        ys.extend(points.imag.tolist())
+                    kinds.extend(curve_kinds)
+            owners.extend([idx] * (len(kinds) - count))
+
+        self.samples = {
+            'x': np.array(xs, dtype=np.float32),
+            'y': np.array(ys, dtype=np.float32),
+            'kind': np.array(kinds, dtype=np.uint8),
+            'path': np.array(owners, dtype=np.int64),
+        }
 
     def convert_to_drawing_commands(self, drawing_area, z_draw=0, z_up=16, pen_down_feedrate=8000, pen_up_feedrate=8000, max_commands=5000):
         """
@@ -155,11 +453,12 @@ class SVGPathParser:
             max_commands (int): Maximum number of commands to generate
 
         Returns:
-            list: List of drawing commands [{'type': 'move'|'draw', 'x': float, 'y': float, 'z': float, 'feedrate': int}, ...]
+            DrawingCommands: Commands as parallel arrays; iterating yields
+                {'type': 'move'|'draw', 'x': float, 'y': float, 'z': float, 'feedrate': int}
         """
         if not self.paths:
             print("WARNING: No paths to convert")
-            return []
+            return DrawingCommands.from_rows([])
 
         # Use z_draw from drawing area if available
         if 'z_draw' in drawing_area:
@@ -167,8 +466,6 @@ class SVGPathParser:
 
         z_up_actual = z_draw + z_up  # Calculate absolute Z for pen up
 
-        commands = []
-
         # Calculate scaling factors to fit SVG into drawing area
         svg_width = self.width or 100
         svg_height = self.height or 100
@@ -192,153 +489,63 @@ class SVGPathParser:
         print(f"📐 Scale factor: {scale:.4f}")
         print(f"📐 Offset: ({offset_x:.2f}, {offset_y:.2f})")
 
-        # Process each path (limited by max_commands setting)
-        path_count = 0
-
-        for path in self.paths:
-            # Stop if we've reached the command limit
-            if len(commands) >= max_commands:
-                print(f"⚠️  Reached command limit ({max_commands}), skipping remaining {len(self.paths) - path_count} paths")
-                break
-
-            path_count += 1
-
-            # Start each path with pen up
-            first_point = True
-
-            for segment in path:
-                # Sample points from the segment
-                if isinstance(segment, Move):
-                    # Move command - pen up
-                    x, y = self._transform_point(segment.end.real, segment.end.imag, scale, offset_x, offset_y)
-                    commands.append({
-                        'type': 'move',
-                        'x': x,
-                        'y': y,
-                        'z': z_up_actual,
-                        'feedrate': pen_up_feedrate
-                    })
-                    first_point = False
-
-                elif isinstance(segment, (Line, Close)):
-                    # Line segment - pen down
-                    x, y = self._transform_point(segment.end.real, segment.end.imag, scale, offset_x, offset_y)
-
-                    # Skip points outside the drawing area (clipping)
-                    if not self._is_in_bounds(x, y, drawing_area):
-                        continue
-
-                    # If first point of this path, move with pen up first
-                    if first_point:
-                        commands.append({
-                            'type': 'move',
-                            'x': x,
-                            'y': y,
-                            'z': z_up_actual,
-                            'feedrate': pen_up_feedrate
-                        })
-                        # Then pen down
-                        commands.append({
-                            'type': 'draw',
-                            'x': x,
-                            'y': y,
-                            'z': z_draw,
-                            'feedrate': pen_down_feedrate
-                        })
-                        first_point = False
-                    else:
-                        commands.append({
-                            'type': 'draw',
-                            'x': x,
-                            'y': y,
-                            'z': z_draw,
-                            'feedrate': pen_down_feedrate
-                        })
-
-                elif isinstance(segment, (CubicBezier, QuadraticBezier, Arc)):
-                    # Curve - sample points and draw as line segments
-                    num_samples = 20
-                    for i in range(num_samples + 1):
-                        t = i / num_samples
-                        point = segment.point(t)
-                        x, y = self._transform_point(point.real, point.imag, scale, offset_x, offset_y)
-
-                        if first_point and i == 0:
-                            # Move to start with pen up
-                            commands.append({
-                                'type': 'move',
-                                'x': x,
-                                'y': y,
-                                'z': z_up_actual,
-                                'feedrate': pen_up_feedrate
-                            })
-                            # Pen down
-                            commands.append({
-                                'type': 'draw',
-                                'x': x,
-                                'y': y,
-                                'z': z_draw,
-                                'feedrate': pen_down_feedrate
-                            })
-                            first_point = False
-                        else:
-                            commands.append({
-                                'type': 'draw',
-                                'x': x,
-                                'y': y,
-                                'z': z_draw,
-                                'feedrate': pen_down_feedrate
-                            })
-
-            # Lift pen at end of path
-            if commands:
-                last_cmd = commands[-1]
-                commands.append({
-                    'type': 'move',
-                    'x': last_cmd['x'],
-                    'y': last_cmd['y'],
-                    'z': z_up_actual,
-                    'feedrate': pen_up_feedrate
-                })
+        # Transform every pre-sampled point at once. Coordinates stay in
+        # float32: sub-micron resolution at DexArm ranges, half the bandwidth
+        samples = self.samples
+        f32 = np.float32
+        xs = samples['x'] * f32(scale) + f32(offset_x)
+        ys = samples['y'] * f32(scale) + f32(offset_y)
+        kind = samples['kind']
+        inside = ((xs >= f32(drawing_area['x_min'])) & (xs <= f32(drawing_area['x_max'])) &
+                  (ys >= f32(drawing_area['y_min'])) & (ys <= f32(drawing_area['y_max'])))
+
+        # Clip line end points one by one; drop a curve only when its whole
+        # sampled hull lies outside the area (moves are never clipped)
+        curve_starts = kind == _CURVE_START
+        is_curve = kind >= _CURVE_START
+        curve_id = (np.cumsum(curve_starts) - 1)[is_curve]
+        curve_visible = np.bincount(curve_id, weights=inside[is_curve],
+                                    minlength=int(np.count_nonzero(curve_starts))) > 0
+        keep = (kind == _MOVE_POINT) | (inside & ~is_curve)
+        keep[is_curve] = curve_visible[curve_id]
+        xs, ys, kind, owner = xs[keep], ys[keep], kind[keep], samples['path'][keep]
+        n = len(kind)
+
+        # Each kept point becomes up to three commands: a pen-up move to it when
+        # it opens its path with a drawn point, the point itself (pen-up for
+        # moves, pen-down otherwise), and a pen lift after the last point of its path
+        new_path = owner[1:] != owner[:-1]
+        opens = np.concatenate(([True], new_path))[:n]
+        closes = np.concatenate((new_path, [True]))[:n]
+        leads = opens & (kind != _MOVE_POINT)
+
+        # Process each path (limited by max_commands setting); the limit is
+        # checked before a path is added, so the last path is never cut short
+        per_path = np.bincount(owner, weights=1 + leads + closes, minlength=len(self.paths))
+        before = np.cumsum(per_path) - per_path
+        path_count = int(np.count_nonzero(before < max_commands))
+        if path_count < len(self.paths):
+            print(f"⚠️  Reached command limit ({max_commands}), skipping remaining {len(self.paths) - path_count} paths")
+        included = owner < path_count
+
+        slots = np.column_stack((leads, np.ones(n, dtype=bool), closes)) & included[:, None]
+        slot_types = np.column_stack((np.full(n, MOVE), np.where(kind == _MOVE_POINT, MOVE, DRAW),
+                                      np.full(n, MOVE))).astype(np.uint8)
+        selected = slots.ravel()
+        types = slot_types.ravel()[selected]
+        is_move = types == MOVE
+
+        commands = DrawingCommands(
+            types,
+            np.repeat(xs, 3)[selected],
+            np.repeat(ys, 3)[selected],
+            np.where(is_move, z_up_actual, z_draw).astype(np.float32),
+            np.where(is_move, pen_up_feedrate, pen_down_feedrate).astype(np.int32)
+        )
 
         print(f"Generated {len(commands)} drawing commands from {path_count} paths")
         return commands
 
-    def _transform_point(self, svg_x, svg_y, scale, offset_x, offset_y):
-        """
-        Transform SVG coordinates to DexArm coordinates
-
-        Args:
-            svg_x (float): SVG X coordinate
-            svg_y (float): SVG Y coordinate
-            scale (float): Scale factor
-            offset_x (float): X offset
-            offset_y (float): Y offset
-
-        Returns:
-            tuple: (x, y) in DexArm coordinates
-        """
-        # Scale and offset
-        x = svg_x * scale + offset_x
-        y = svg_y * scale + offset_y
-
-        return (x, y)
-
-    def _is_in_bounds(self, x, y, drawing_area):
-        """
-        Check if a point is within the drawing area bounds
-
-        Args:
-            x (float): X coordinate
-            y (float): Y coordinate
-            drawing_area (dict): Drawing area bounds
-
-        Returns:
-            bool: True if point is within bounds
-        """
-        return (drawing_area['x_min'] <= x <= drawing_area['x_max'] and
-                drawing_area['y_min'] <= y <= drawing_area['y_max'])
-
 
 # Global parser instance
 svg_parser = SVGPathParser()
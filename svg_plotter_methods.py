@@ -4,10 +4,11 @@ Alternative SVG Generation Methods for Plotter Drawing
 Three different approaches optimized for continuous, smooth pen plotting.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 from scipy import ndimage
-from scipy.spatial import distance_matrix
+from scipy.spatial import cKDTree
 import svgwrite
 from skimage.morphology import skeletonize, medial_axis
 from skimage import img_as_ubyte
@@ -39,23 +40,25 @@ class PlotterSVGGenerator:
 
         height, width = img.shape
 
-        # Generate all 3 methods
-        results = {}
+        # Generate all 3 methods; they share only the loaded image and each
+        # writes its own file. The heavy OpenCV/scikit-image calls release
+        # the GIL, so a small thread pool overlaps them without spawning processes
+        methods = [
+            ('method1', "Centerline Tracing (Plotter-optimized)",
+             self._method1_centerline_tracing, f"{base_filename}_method1_centerline.svg"),
+            ('method2', "Thick Line Detection with Joining",
+             self._method2_thick_line_joining, f"{base_filename}_method2_thick_joining.svg"),
+            ('method3', "CNC V-Carving Style (Variable Width)",
+             self._method3_cnc_vcarving_style, f"{base_filename}_method3_cnc_style.svg"),
+        ]
 
-        print("🎨 Generating Method 1: Centerline Tracing (Plotter-optimized)...")
-        results['method1'] = self._method1_centerline_tracing(
-            img, width, height, f"{base_filename}_method1_centerline.svg"
-        )
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = {}
+            for key, label, method, filename in methods:
+                print(f"🎨 Generating {key.replace('method', 'Method ')}: {label}...")
+                futures[key] = pool.submit(method, img, width, height, filename)
 
-        print("🎨 Generating Method 2: Thick Line Detection with Joining...")
-        results['method2'] = self._method2_thick_line_joining(
-            img, width, height, f"{base_filename}_method2_thick_joining.svg"
-        )
-
-        print("🎨 Generating Method 3: CNC V-Carving Style (Variable Width)...")
-        results['method3'] = self._method3_cnc_vcarving_style(
-            img, width, height, f"{base_filename}_method3_cnc_style.svg"
-        )
+            results = {key: future.result() for key, future in futures.items()}
 
         return results
 
@@ -86,8 +89,11 @@ class PlotterSVGGenerator:
 
         # 4. Skeletonize to find centerlines
         # This creates single-pixel-wide paths along the center of thick strokes
-        skeleton = skeletonize(inverted > 128)
-        skeleton = img_as_ubyte(skeleton)
+        if hasattr(cv2, 'ximgproc'):
+            # opencv-contrib-python provides a C++ Guo-Hall thinning (0/255 in and out)
+            skeleton = cv2.ximgproc.thinning(inverted, thinningType=cv2.ximgproc.THINNING_GUOHALL)
+        else:
+            skeleton = img_as_ubyte(skeletonize(inverted > 128))
 
         # 5. Find contours in the skeleton
         skeleton_contours, _ = cv2.findContours(
@@ -98,12 +104,13 @@ class PlotterSVGGenerator:
         polylines = []
         for contour in skeleton_contours:
             if len(contour) > 3:  # Skip very short segments
-                # Simplify path using Douglas-Peucker
+                # Simplify path using Douglas-Peucker; at this sub-pixel epsilon
+                # short TC89-approximated runs are already near-minimal
                 epsilon = 0.5  # Lower = more detail
-                simplified = cv2.approxPolyDP(contour, epsilon, False)
+                simplified = contour if len(contour) < 20 else cv2.approxPolyDP(contour, epsilon, False)
 
                 if len(simplified) > 1:
-                    points = [(int(pt[0][0]), int(pt[0][1])) for pt in simplified]
+                    points = list(map(tuple, simplified.reshape(-1, 2).tolist()))
                     polylines.append(points)
 
         # 7. Optimize drawing order using greedy nearest-neighbor
@@ -163,7 +170,7 @@ class PlotterSVGGenerator:
 
             if len(simplified) > 1:
                 # Extract endpoints
-                points = [tuple(pt[0]) for pt in simplified]
+                points = list(map(tuple, simplified.reshape(-1, 2).tolist()))
                 segments.append({
                     'points': points,
                     'start': points[0],
@@ -224,11 +231,18 @@ class PlotterSVGGenerator:
         # Layer 1: Outer contours (light edges)
         edges_light = cv2.Canny(img, 20, 60)
 
+        # The stricter layers reuse the light edge map instead of running Canny
+        # again: keep its edge pixels whose gradient (L1, as Canny measures it)
+        # clears that layer's low threshold
+        grad_x = cv2.Sobel(img, cv2.CV_16S, 1, 0, ksize=3)
+        grad_y = cv2.Sobel(img, cv2.CV_16S, 0, 1, ksize=3)
+        magnitude = np.abs(grad_x.astype(np.int32)) + np.abs(grad_y.astype(np.int32))
+
         # Layer 2: Medium contours
-        edges_medium = cv2.Canny(img, 40, 120)
+        edges_medium = np.where(magnitude > 40, edges_light, 0).astype(np.uint8)
 
         # Layer 3: Inner contours (dark edges)
-        edges_dark = cv2.Canny(img, 80, 200)
+        edges_dark = np.where(magnitude > 80, edges_light, 0).astype(np.uint8)
 
         # 2. Process each layer with different stroke widths
         layers = [
@@ -252,7 +266,7 @@ class PlotterSVGGenerator:
                     simplified = cv2.approxPolyDP(contour, epsilon, False)
 
                     if len(simplified) > 1:
-                        points = [(int(pt[0][0]), int(pt[0][1])) for pt in simplified]
+                        points = list(map(tuple, simplified.reshape(-1, 2).tolist()))
                         all_paths.append((points, stroke_width))
 
         # 3. Optimize drawing order (draw from outside to inside)
@@ -291,42 +305,41 @@ class PlotterSVGGenerator:
         """
         Optimize drawing order using greedy nearest-neighbor TSP approximation.
         Minimizes pen-up travel distance.
+
+        Endpoints of all polylines go into a KD-tree; endpoint 2i is the start
+        of polyline i and 2i+1 its end (drawn reversed).
         """
         if not polylines:
             return []
 
-        ordered = []
-        remaining = polylines.copy()
+        n = len(polylines)
+        endpoints = np.array([[p[0], p[-1]] for p in polylines], dtype=np.float64).reshape(-1, 2)
+        tree = cKDTree(endpoints)
+        alive = np.ones(n, dtype=bool)
 
         # Start with first polyline
-        current = remaining.pop(0)
-        ordered.append(current)
-        current_end = current[-1]
+        alive[0] = False
+        ordered = [polylines[0]]
+        current_end = polylines[0][-1]
 
         # Greedy nearest-neighbor
-        while remaining:
-            # Find nearest polyline (by start or end point)
-            min_dist = float('inf')
-            best_idx = 0
-            best_reverse = False
-
-            for idx, poly in enumerate(remaining):
-                # Distance to start
-                dist_start = self._point_distance(current_end, poly[0])
-                if dist_start < min_dist:
-                    min_dist = dist_start
-                    best_idx = idx
-                    best_reverse = False
-
-                # Distance to end (would need to reverse)
-                dist_end = self._point_distance(current_end, poly[-1])
-                if dist_end < min_dist:
-                    min_dist = dist_end
-                    best_idx = idx
-                    best_reverse = True
-
-            # Add best match
-            next_poly = remaining.pop(best_idx)
+        for _ in range(n - 1):
+            # Widen the query until it reaches an endpoint of an unused polyline
+            k = 8
+            best = None
+            while best is None:
+                k = min(k, 2 * n)
+                _, idxs = tree.query(current_end, k=k)
+                for idx in np.atleast_1d(idxs):
+                    if alive[idx // 2]:
+                        best = int(idx)
+                        break
+                k *= 2
+
+            # Add best match (an end hit means the polyline is drawn reversed)
+            poly_idx, best_reverse = divmod(best, 2)
+            alive[poly_idx] = False
+            next_poly = polylines[poly_idx]
             if best_reverse:
                 next_poly = list(reversed(next_poly))
 
@@ -345,6 +358,17 @@ class PlotterSVGGenerator:
         # Sort by length (longest first)
         segments.sort(key=lambda s: s['length'], reverse=True)
 
+        # Spatial indexes over segment starts and ends (indices follow the sorted order)
+        start_points = [seg['start'] for seg in segments]
+        end_points = [seg['end'] for seg in segments]
+        starts = cKDTree(np.array(start_points, dtype=np.float64))
+        ends = cKDTree(np.array(end_points, dtype=np.float64))
+
+        def near(tree, points, point):
+            """Indices whose point lies strictly within threshold of point"""
+            return {j for j in tree.query_ball_point(point, r=threshold)
+                    if self._point_distance(point, points[j]) < threshold}
+
         joined_paths = []
         used = set()
 
@@ -357,37 +381,28 @@ class PlotterSVGGenerator:
             used.add(i)
             current_end = seg['end']
 
-            # Try to extend this path by finding nearby segments
-            changed = True
-            while changed:
-                changed = False
-
-                for j, candidate in enumerate(segments):
-                    if j in used:
-                        continue
-
-                    # Check if candidate start is near current end
-                    dist = self._point_distance(current_end, candidate['start'])
-
-                    if dist < threshold:
-                        # Extend path
-                        current_path.extend(candidate['points'][1:])  # Skip duplicate point
-                        current_end = candidate['end']
-                        used.add(j)
-                        changed = True
-                        break
-
-                    # Check if candidate end is near current end (reverse it)
-                    dist_reverse = self._point_distance(current_end, candidate['end'])
-
-                    if dist_reverse < threshold:
-                        # Extend path with reversed candidate
-                        reversed_points = list(reversed(candidate['points']))
-                        current_path.extend(reversed_points[1:])
-                        current_end = candidate['start']
-                        used.add(j)
-                        changed = True
-                        break
+            # Try to extend this path by finding nearby segments: take the
+            # first unused candidate (in sorted order) whose start, or else
+            # whose end (reversed), is near the current end
+            while True:
+                start_hits = near(starts, start_points, current_end) - used
+                end_hits = near(ends, end_points, current_end) - used
+                if not start_hits and not end_hits:
+                    break
+
+                j = min(start_hits | end_hits)
+                candidate = segments[j]
+                used.add(j)
+
+                if j in start_hits:
+                    # Extend path
+                    current_path.extend(candidate['points'][1:])  # Skip duplicate point
+                    current_end = candidate['end']
+                else:
+                    # Extend path with reversed candidate
+                    reversed_points = list(reversed(candidate['points']))
+                    current_path.extend(reversed_points[1:])
+                    current_end = candidate['start']
 
             joined_paths.append(current_path)
 
@@ -400,18 +415,12 @@ class PlotterSVGGenerator:
         if len(points) < 3:
             return points
 
-        # Extract x and y coordinates
-        x_coords = np.array([p[0] for p in points], dtype=float)
-        y_coords = np.array([p[1] for p in points], dtype=float)
-
-        # Apply Gaussian smoothing
-        x_smooth = ndimage.gaussian_filter1d(x_coords, sigma=sigma, mode='nearest')
-        y_smooth = ndimage.gaussian_filter1d(y_coords, sigma=sigma, mode='nearest')
-
-        # Reconstruct points
-        smoothed = [(int(x), int(y)) for x, y in zip(x_smooth, y_smooth)]
+        # Smooth x and y together along the point axis in one call
+        coords = np.asarray(points, dtype=np.float64)
+        smoothed = ndimage.gaussian_filter1d(coords, sigma=sigma, axis=0, mode='nearest')
 
-        return smoothed
+        # Reconstruct points (truncated to integer pixels, as int() does)
+        return list(map(tuple, smoothed.astype(np.int32).tolist()))
 
     def _point_distance(self, p1, p2):
         """Calculate Euclidean distance between two points."""
@@ -5,12 +5,84 @@ Focus on the promising thick joining approach with parameter variations
 and zigzag fill for small closed areas.
 """
 
+from collections import defaultdict
 import cv2
 import numpy as np
 from scipy import ndimage
+from scipy.spatial import cKDTree
 import svgwrite
 import os
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; segments are joined through a KD-tree instead
+    njit = None
+
+
+def _join_kernel(starts, ends, threshold, order, reverse, path_offsets):
+    """
+    Greedily chain segments (already sorted longest first) end to start
+
+    Writes the segment indices of each joined path consecutively into
+    `order` (with `reverse` set where a segment is walked end to start) and
+    the start of path p at path_offsets[p]. Returns the number of paths.
+    Compiled with Numba when available.
+    """
+    n = starts.shape[0]
+    threshold_sq = threshold * threshold
+    used = np.zeros(n, dtype=np.bool_)
+    count = 0
+    paths = 0
+    for i in range(n):
+        if used[i]:
+            continue
+        used[i] = True
+        path_offsets[paths] = count
+        paths += 1
+        order[count] = i
+        reverse[count] = False
+        count += 1
+        end_x = ends[i, 0]
+        end_y = ends[i, 1]
+
+        # Take the first unused segment whose start, or else whose end, is near
+        extended = True
+        while extended:
+            extended = False
+            for j in range(n):
+                if used[j]:
+                    continue
+                dx = end_x - starts[j, 0]
+                dy = end_y - starts[j, 1]
+                flip = False
+                if dx * dx + dy * dy >= threshold_sq:
+                    dx = end_x - ends[j, 0]
+                    dy = end_y - ends[j, 1]
+                    if dx * dx + dy * dy >= threshold_sq:
+                        continue
+                    flip = True
+                used[j] = True
+                order[count] = j
+                reverse[count] = flip
+                count += 1
+                if flip:
+                    end_x = starts[j, 0]
+                    end_y = starts[j, 1]
+                else:
+                    end_x = ends[j, 0]
+                    end_y = ends[j, 1]
+                extended = True
+                break
+    path_offsets[paths] = count
+    return paths
+
+
+_join_jit = njit(cache=True)(_join_kernel) if njit else None
+
+# From this many paths on, drawing order uses the grid spatial hash: its
+# buckets drop used endpoints, where KD-tree queries must skip past them
+_GRID_ORDER_MIN_PATHS = 2000
+
 
 class ThickJoiningVariations:
     """Generate 10 variations of the thick joining method"""
@@ -19,13 +91,15 @@ class ThickJoiningVariations:
         self.output_dir = 'svgs'
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def generate_all_variations(self, image_path, base_filename):
+    def generate_all_variations(self, image_path, base_filename, fast_edges=False):
         """
         Generate thick_v1 variation only (conservative joining)
 
         Args:
             image_path: Path to input JPG image
             base_filename: Base name for output SVG files
+            fast_edges: Detect edges with a morphological gradient instead of
+                        Canny (faster, slightly thicker edges)
 
         Returns:
             dict: Paths to generated SVG files
@@ -49,7 +123,8 @@ class ThickJoiningVariations:
             img, width, height, filename,
             join_threshold=10,
             smooth_sigma=1.0,
-            fill_small_areas=False
+            fill_small_areas=False,
+            fast_edges=fast_edges
         )
 
         print("\n" + "="*70)
@@ -60,7 +135,8 @@ class ThickJoiningVariations:
 
     def _thick_joining_base(self, img, width, height, filename,
                             join_threshold=15, smooth_sigma=1.5,
-                            fill_small_areas=False, fill_max_area=500):
+                            fill_small_areas=False, fill_max_area=500,
+                            fast_edges=False):
         """
         Base thick joining method with configurable parameters
 
@@ -69,6 +145,7 @@ class ThickJoiningVariations:
             smooth_sigma: Gaussian smoothing sigma
             fill_small_areas: Whether to fill small closed areas with zigzag
             fill_max_area: Maximum area (px²) to fill with zigzag
+            fast_edges: Use a thresholded morphological gradient instead of Canny
         """
         dwg = svgwrite.Drawing(
             os.path.join(self.output_dir, filename),
@@ -76,9 +153,22 @@ class ThickJoiningVariations:
             viewBox=f'0 0 {width} {height}'
         )
 
-        # 1. Edge detection with bilateral filter
-        blurred = cv2.bilateralFilter(img, 9, 75, 75)
-        edges = cv2.Canny(blurred, 50, 150)
+        # 1. Edge detection on a lightly blurred image (a small Gaussian is
+        # enough to quiet noise for line art, at a fraction of a bilateral
+        # filter's cost); through a UMat OpenCV runs these steps as OpenCL
+        # kernels when a device is available
+        use_opencl = cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+        blurred = cv2.GaussianBlur(cv2.UMat(img) if use_opencl else img, (5, 5), 1.0)
+        if fast_edges:
+            # Dilate minus erode: no non-maximum suppression or hysteresis,
+            # at the cost of thicker, less precise edges
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+            gradient = cv2.morphologyEx(blurred, cv2.MORPH_GRADIENT, kernel)
+            _, edges = cv2.threshold(gradient, 20, 255, cv2.THRESH_BINARY)
+        else:
+            edges = cv2.Canny(blurred, 50, 150)
+        if use_opencl:
+            edges = edges.get()
 
         # 2. Find contours
         contours, hierarchy = cv2.findContours(
@@ -93,12 +183,19 @@ class ThickJoiningVariations:
             if len(contour) < 5:
                 continue
 
-            # Simplify contour
-            epsilon = 1.0
-            simplified = cv2.approxPolyDP(contour, epsilon, False)
+            # Simplify contour; epsilon grows with perimeter so long, smooth
+            # contours exit Douglas-Peucker early, and short ones are kept as-is
+            if len(contour) > 8:
+                epsilon = max(1.0, 0.002 * cv2.arcLength(contour, False))
+                simplified = cv2.approxPolyDP(contour, epsilon, False)
+            else:
+                simplified = contour
 
             if len(simplified) > 1:
-                points = [tuple(pt[0]) for pt in simplified]
+                # Segments keep their pixel points as one (K, 2) int16 array;
+                # joining and smoothing work on arrays, tuples are only made
+                # for drawing
+                points = simplified.reshape(-1, 2).astype(np.int16)
 
                 # Check if contour is closed
                 is_closed = cv2.contourArea(contour) > 0
@@ -140,38 +237,42 @@ class ThickJoiningVariations:
             ordered_paths = self._optimize_path_order(smoothed_paths)
 
             # Draw smooth paths
-            for points in ordered_paths:
-                if len(points) > 1:
-                    dwg.add(dwg.polyline(
-                        points=points,
-                        stroke='black',
-                        fill='none',
-                        stroke_width=1.2,
-                        stroke_linecap='round',
-                        stroke_linejoin='round'
-                    ))
+            self._add_polylines(dwg, ordered_paths, stroke_width=1.2)
 
         # 7. Add zigzag fill for small closed areas (if enabled)
         if fill_small_areas and closed_contours:
             print(f"   Adding zigzag fill to {len(closed_contours)} small areas...")
             zigzag_paths = self._generate_zigzag_fills(closed_contours, spacing=5)
-
-            for points in zigzag_paths:
-                if len(points) > 1:
-                    dwg.add(dwg.polyline(
-                        points=points,
-                        stroke='black',
-                        fill='none',
-                        stroke_width=0.8,
-                        stroke_linecap='round',
-                        stroke_linejoin='round'
-                    ))
+            self._add_polylines(dwg, [path.tolist() for path in zigzag_paths], stroke_width=0.8)
 
         dwg.save()
         print(f"   ✅ Saved: {filename} ({len(smoothed_paths)} paths" +
               (f", {len(closed_contours)} filled)" if fill_small_areas else ")"))
         return os.path.join(self.output_dir, filename)
 
+    def _add_polylines(self, dwg, polylines, stroke_width):
+        """
+        Add polylines to the drawing, one <polyline> element each
+
+        Separate elements keep each polyline a path of its own for the
+        parser's longest-first ordering and max_commands cap.
+
+        Args:
+            dwg: svgwrite Drawing
+            polylines: Lists of (x, y) points; those with fewer than 2 are skipped
+            stroke_width: Stroke width shared by all polylines
+        """
+        for points in polylines:
+            if len(points) > 1:
+                dwg.add(dwg.polyline(
+                    points=points,
+                    stroke='black',
+                    fill='none',
+                    stroke_width=stroke_width,
+                    stroke_linecap='round',
+                    stroke_linejoin='round'
+                ))
+
     def _generate_zigzag_fills(self, closed_contours, spacing=5):
         """
         Generate continuous zigzag fill patterns for small closed areas
@@ -186,7 +287,7 @@ class ThickJoiningVariations:
             spacing: Spacing between zigzag lines (pixels)
 
         Returns:
-            List of polylines (each is a continuous path: outline + zigzag)
+            List of (N, 2) point arrays (each is a continuous path: outline + zigzag)
         """
         zigzag_paths = []
 
@@ -197,77 +298,65 @@ class ThickJoiningVariations:
             # Get bounding box
             x, y, w, h = cv2.boundingRect(contour)
 
-            # Generate horizontal zigzag lines
-            zigzag_points = []
-
-            # Start from outline's first point
-            zigzag_points.append(points[0])
-
-            # Generate zigzag inside the contour
-            y_current = y + spacing
-            direction = 1  # 1 = left to right, -1 = right to left
-
-            while y_current < y + h:
-                # Find intersections with contour at this y level
-                intersections = []
-
-                for i in range(len(contour)):
-                    pt1 = tuple(contour[i][0])
-                    pt2 = tuple(contour[(i + 1) % len(contour)][0])
-
-                    # Check if horizontal line at y_current intersects this edge
-                    if (pt1[1] <= y_current <= pt2[1]) or (pt2[1] <= y_current <= pt1[1]):
-                        if pt2[1] != pt1[1]:  # Avoid division by zero
-                            # Calculate x intersection
-                            t = (y_current - pt1[1]) / (pt2[1] - pt1[1])
-                            x_intersect = int(pt1[0] + t * (pt2[0] - pt1[0]))
-                            intersections.append(x_intersect)
-
-                # Sort intersections
-                intersections = sorted(set(intersections))
-
-                # Add zigzag points (alternate direction)
-                if len(intersections) >= 2:
-                    if direction == 1:
-                        # Left to right
-                        zigzag_points.append((intersections[0], y_current))
-                        zigzag_points.append((intersections[-1], y_current))
-                    else:
-                        # Right to left
-                        zigzag_points.append((intersections[-1], y_current))
-                        zigzag_points.append((intersections[0], y_current))
-
-                    direction *= -1  # Flip direction
-
-                y_current += spacing
-
-            # Close by connecting back to start if needed
-            if len(zigzag_points) > 1:
-                # Add outline points to make it continuous
-                # Ensure all points are tuples (x, y)
-                validated_points = []
-                for pt in points:
-                    if isinstance(pt, tuple) and len(pt) == 2:
-                        validated_points.append(pt)
-
-                for pt in zigzag_points:
-                    if isinstance(pt, tuple) and len(pt) == 2:
-                        validated_points.append(pt)
-
-                if len(validated_points) > 1:
-                    zigzag_paths.append(validated_points)
+            # Rasterize the contour once into a bounding-box-sized mask
+            mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.drawContours(mask, [contour], -1, 1, thickness=cv2.FILLED, offset=(-x, -y))
+
+            # Generate horizontal zigzag lines: leftmost and rightmost filled
+            # pixel of every scanline row inside the contour
+            rows = mask[spacing:h:spacing]
+            lefts = rows.argmax(axis=1)
+            rights = w - 1 - rows[:, ::-1].argmax(axis=1)
+            spans = rows.any(axis=1) & (rights > lefts)
+            lefts = lefts[spans] + x
+            rights = rights[spans] + x
+            row_ys = (np.arange(spacing, h, spacing) + y)[spans]
+
+            # Alternate direction: even lines run left to right, odd ones
+            # right to left; each line contributes two (x, y) points
+            flip = np.arange(len(row_ys)) % 2 == 1
+            zigzag = np.stack([np.where(flip, rights, lefts), row_ys,
+                               np.where(flip, lefts, rights), row_ys], axis=1)
+
+            # Outline, back to its first point, then the zigzag lines, as one
+            # continuous path
+            if len(zigzag):
+                zigzag_paths.append(np.concatenate([points, points[:1], zigzag.reshape(-1, 2)]))
 
         return zigzag_paths
 
     def _join_nearby_segments(self, segments, threshold):
         """
         Join line segments that are close together into continuous paths.
+
+        Endpoint 2j is the start of segment j and 2j+1 its end (indices follow
+        the sorted order); all endpoint pairs within threshold are found with
+        one KD-tree query and kept as adjacency lists.
         """
         if not segments:
             return []
 
-        # Sort by length (longest first)
-        segments.sort(key=lambda s: s['length'], reverse=True)
+        # Sort by length (longest first); the stable sort of negated lengths
+        # keeps equal-length segments in their original order
+        lengths = np.fromiter((seg['length'] for seg in segments), dtype=np.float64, count=len(segments))
+        segments = [segments[i] for i in np.argsort(-lengths, kind='stable').tolist()]
+
+        if _join_jit is not None:
+            return self._join_segments_compiled(segments, threshold)
+
+        endpoints = np.array([[seg['start'], seg['end']] for seg in segments],
+                             dtype=np.float64).reshape(-1, 2)
+        pairs = cKDTree(endpoints).query_pairs(threshold, output_type='ndarray')
+
+        # query_pairs includes the boundary; joining needs strictly closer endpoints
+        if len(pairs):
+            deltas = endpoints[pairs[:, 0]] - endpoints[pairs[:, 1]]
+            pairs = pairs[np.einsum('ij,ij->i', deltas, deltas) < threshold * threshold]
+
+        neighbours = [[] for _ in range(len(endpoints))]
+        for a, b in pairs.tolist():
+            neighbours[a].append(b)
+            neighbours[b].append(a)
 
         joined_paths = []
         used = set()
@@ -277,43 +366,65 @@ class ThickJoiningVariations:
                 continue
 
             # Start new path
-            current_path = list(seg['points'])
+            current_path = [seg['points']]
             used.add(i)
-            current_end = seg['end']
-
-            # Try to extend this path by finding nearby segments
-            changed = True
-            while changed:
-                changed = False
+            current_end = 2 * i + 1
+
+            # Try to extend this path: take the first unused segment (in sorted
+            # order) with an endpoint near the current end, preferring its start
+            while True:
+                hits = {b for b in neighbours[current_end] if b // 2 not in used}
+                if not hits:
+                    break
+
+                j = min(hits) // 2
+                candidate = segments[j]
+                used.add(j)
+
+                if 2 * j in hits:
+                    # Extend path
+                    current_path.append(candidate['points'][1:])  # Skip duplicate point
+                    current_end = 2 * j + 1
+                else:
+                    # Extend path with reversed candidate
+                    current_path.append(candidate['points'][-2::-1])
+                    current_end = 2 * j
+
+            joined_paths.append(np.concatenate(current_path))
 
-                for j, candidate in enumerate(segments):
-                    if j in used:
-                        continue
-
-                    # Check if candidate start is near current end
-                    dist = self._point_distance(current_end, candidate['start'])
+        return joined_paths
 
-                    if dist < threshold:
-                        # Extend path
-                        current_path.extend(candidate['points'][1:])
-                        current_end = candidate['end']
-                        used.add(j)
-                        changed = True
-                        break
+    def _join_segments_compiled(self, segments, threshold):
+        """
+        Join sorted segments with the compiled greedy kernel
 
-                    # Check if candidate end is near current end (reverse it)
-                    dist_reverse = self._point_distance(current_end, candidate['end'])
+        Args:
+            segments: Segment dicts, sorted longest first
+            threshold: Join distance (pixels)
 
-                    if dist_reverse < threshold:
-                        # Extend path with reversed candidate
-                        reversed_points = list(reversed(candidate['points']))
-                        current_path.extend(reversed_points[1:])
-                        current_end = candidate['start']
-                        used.add(j)
-                        changed = True
-                        break
+        Returns:
+            list: Joined paths as (K, 2) point arrays
+        """
+        n = len(segments)
+        starts = np.array([seg['start'] for seg in segments], dtype=np.float64)
+        ends = np.array([seg['end'] for seg in segments], dtype=np.float64)
+        order = np.empty(n, dtype=np.int32)
+        reverse = np.empty(n, dtype=np.bool_)
+        path_offsets = np.empty(n + 1, dtype=np.int32)
+        paths = _join_jit(starts, ends, float(threshold), order, reverse, path_offsets)
+
+        order = order.tolist()
+        reverse = reverse.tolist()
+        path_offsets = path_offsets[:paths + 1].tolist()
 
-            joined_paths.append(current_path)
+        joined_paths = []
+        for p in range(paths):
+            first, last = path_offsets[p], path_offsets[p + 1]
+            current_path = [segments[order[first]]['points']]
+            for k in range(first + 1, last):
+                points = segments[order[k]]['points']
+                current_path.append(points[-2::-1] if reverse[k] else points[1:])
+            joined_paths.append(np.concatenate(current_path))
 
         return joined_paths
 
@@ -322,48 +433,123 @@ class ThickJoiningVariations:
         if len(points) < 3:
             return points
 
-        x_coords = np.array([p[0] for p in points], dtype=float)
-        y_coords = np.array([p[1] for p in points], dtype=float)
-
-        x_smooth = ndimage.gaussian_filter1d(x_coords, sigma=sigma, mode='nearest')
-        y_smooth = ndimage.gaussian_filter1d(y_coords, sigma=sigma, mode='nearest')
+        # Smooth x and y together along the point axis in one call
+        coords = np.asarray(points, dtype=np.float64)
+        smoothed = ndimage.gaussian_filter1d(coords, sigma=sigma, axis=0, mode='nearest')
 
-        smoothed = [(int(x), int(y)) for x, y in zip(x_smooth, y_smooth)]
-        return smoothed
+        # Truncated to integer pixels, as int() does
+        return list(map(tuple, smoothed.astype(np.int32).tolist()))
 
     def _optimize_path_order(self, polylines):
         """
         Optimize drawing order using greedy nearest-neighbor.
+
+        Endpoints of all polylines go into a KD-tree; endpoint 2i is the start
+        of polyline i and 2i+1 its end (drawn reversed).
         """
         if not polylines:
             return []
 
-        ordered = []
-        remaining = polylines.copy()
+        n = len(polylines)
+        if n >= _GRID_ORDER_MIN_PATHS:
+            return self._optimize_path_order_grid(polylines)
+
+        endpoints = np.array([[p[0], p[-1]] for p in polylines], dtype=np.float64).reshape(-1, 2)
+        tree = cKDTree(endpoints)
+        alive = np.ones(n, dtype=bool)
+
+        alive[0] = False
+        ordered = [polylines[0]]
+        current_end = polylines[0][-1]
+
+        for _ in range(n - 1):
+            # Widen the query until it reaches an endpoint of an unused polyline
+            k = 16
+            best = None
+            while best is None:
+                k = min(k, 2 * n)
+                _, idxs = tree.query(current_end, k=k)
+                for idx in np.atleast_1d(idxs):
+                    if alive[idx // 2]:
+                        best = int(idx)
+                        break
+                k *= 2
 
-        current = remaining.pop(0)
-        ordered.append(current)
-        current_end = current[-1]
+            # An end hit means the polyline is drawn reversed
+            poly_idx, best_reverse = divmod(best, 2)
+            alive[poly_idx] = False
+            next_poly = polylines[poly_idx]
+            if best_reverse:
+                next_poly = list(reversed(next_poly))
 
-        while remaining:
-            min_dist = float('inf')
-            best_idx = 0
-            best_reverse = False
+            ordered.append(next_poly)
+            current_end = next_poly[-1]
 
-            for idx, poly in enumerate(remaining):
-                dist_start = self._point_distance(current_end, poly[0])
-                if dist_start < min_dist:
-                    min_dist = dist_start
-                    best_idx = idx
-                    best_reverse = False
+        return ordered
 
-                dist_end = self._point_distance(current_end, poly[-1])
-                if dist_end < min_dist:
-                    min_dist = dist_end
-                    best_idx = idx
-                    best_reverse = True
+    def _optimize_path_order_grid(self, polylines):
+        """
+        Greedy nearest-neighbor ordering over a uniform-grid spatial hash
 
-            next_poly = remaining.pop(best_idx)
+        Endpoint 2i is the start of polyline i and 2i+1 its end; buckets hold
+        only endpoints of unused polylines. Rings of cells are searched outward
+        until no unsearched cell can hold a closer endpoint, and ties go to the
+        lowest endpoint index.
+        """
+        n = len(polylines)
+        endpoints = np.array([[p[0], p[-1]] for p in polylines], dtype=np.float64).reshape(-1, 2)
+        # About one endpoint per cell on average over the bounding box
+        extent = endpoints.max(axis=0) - endpoints.min(axis=0) + 1
+        cell = max(8, int(np.sqrt(extent[0] * extent[1] / (2 * n))))
+
+        cells = (endpoints // cell).astype(np.int64)
+        min_cx, min_cy = cells.min(axis=0).tolist()
+        max_cx, max_cy = cells.max(axis=0).tolist()
+        coords = endpoints.tolist()
+        keys = list(map(tuple, cells.tolist()))
+        buckets = defaultdict(set)
+        for e, key in enumerate(keys):
+            buckets[key].add(e)
+
+        def ring(cx, cy, r):
+            """Cells at Chebyshev distance exactly r from (cx, cy)"""
+            if r == 0:
+                yield cx, cy
+                return
+            for gx in range(cx - r, cx + r + 1):
+                yield gx, cy - r
+                yield gx, cy + r
+            for gy in range(cy - r + 1, cy + r):
+                yield cx - r, gy
+                yield cx + r, gy
+
+        buckets[keys[0]].discard(0)
+        buckets[keys[1]].discard(1)
+        ordered = [polylines[0]]
+        current_end = polylines[0][-1]
+
+        for _ in range(n - 1):
+            px, py = float(current_end[0]), float(current_end[1])
+            cx, cy = int(px // cell), int(py // cell)
+            reach = max(cx - min_cx, max_cx - cx, cy - min_cy, max_cy - cy)
+
+            # Cells beyond ring r are more than r * cell away
+            best = None
+            for r in range(reach + 1):
+                for key in ring(cx, cy, r):
+                    for e in buckets.get(key, ()):
+                        ex, ey = coords[e]
+                        candidate = ((ex - px) ** 2 + (ey - py) ** 2, e)
+                        if best is None or candidate < best:
+                            best = candidate
+                if best is not None and best[0] < (r * cell) ** 2:
+                    break
+
+            # An end hit means the polyline is drawn reversed
+            poly_idx, best_reverse = divmod(best[1], 2)
+            buckets[keys[2 * poly_idx]].discard(2 * poly_idx)
+            buckets[keys[2 * poly_idx + 1]].discard(2 * poly_idx + 1)
+            next_poly = polylines[poly_idx]
             if best_reverse:
                 next_poly = list(reversed(next_poly))
 
@@ -372,20 +558,13 @@ class ThickJoiningVariations:
 
         return ordered
 
-    def _point_distance(self, p1, p2):
-        """Calculate Euclidean distance between two points."""
-        return np.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
-
     def _polyline_length(self, points):
         """Calculate total length of a polyline."""
         if len(points) < 2:
             return 0
 
-        total = 0
-        for i in range(len(points) - 1):
-            total += self._point_distance(points[i], points[i + 1])
-
-        return total
+        deltas = np.diff(np.asarray(points, dtype=np.float64), axis=0)
+        return float(np.hypot(deltas[:, 0], deltas[:, 1]).sum())
 
 
 # Global instance